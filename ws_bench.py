@@ -0,0 +1,307 @@
+"""
+QR Detector Benchmark
+Generator corpus QR sintetis dan benchmark throughput semua detector
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Foto sensus asli tidak bisa dibagikan, jadi benchmark memakai corpus
+sintetis yang bisa dibuat ulang persis sama (seed tetap): QR berisi ID 14
+digit dibuat dengan cv2.QRCodeEncoder lalu diberi degradasi terkontrol.
+
+Penggunaan:
+    python -m ws_bench generate CORPUS --count 20 --seed 3206
+    python -m ws_bench run CORPUS --output hasil.json
+    python -m ws_bench compare sebelum.json sesudah.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+
+import cv2
+import numpy as np
+
+from ws_detector import StableQRDetector, decode_qr_from_image
+from ws_engine import extract_id
+
+
+MANIFEST_FILENAME = "corpus.json"
+DEFAULT_SEED = 3206
+DEFAULT_COUNT = 20
+
+# Degradasi yang dibuat untuk setiap payload
+DEGRADATIONS = ["clean", "rotation", "blur", "perspective", "jpeg", "low_contrast", "large_canvas"]
+
+CANVAS_SIZE = (1600, 1200)          # tinggi × lebar foto biasa
+LARGE_CANVAS_SIZE = (3000, 4000)    # ±12 MP, QR kecil di tengah foto besar
+
+# Detector yang dibandingkan: nama → profile StableQRDetector
+# (None = decoder ws_rename.py, ws_detector.decode_qr_from_image)
+DETECTORS = {
+    "ws_rename": None,
+    "simple": "simple",
+    "stable": "stable",
+    "universal": "universal",
+}
+
+
+def make_qr(payload, module_px=8, border=4):
+    """Gambar QR (grayscale, background putih) dari payload"""
+    encoder = cv2.QRCodeEncoder.create()
+    qr = encoder.encode(payload)
+    qr = cv2.resize(qr, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+    pad = border * module_px
+    return cv2.copyMakeBorder(qr, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+
+
+def place_on_canvas(qr, canvas_size, rng):
+    """Tempel QR di posisi acak pada kanvas abu-abu terang bernoise"""
+    height, width = canvas_size
+    canvas = np.full((height, width), 215, dtype=np.uint8)
+    noise = rng.integers(-12, 13, size=(height, width), dtype=np.int16)
+    canvas = np.clip(canvas.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    qh, qw = qr.shape[:2]
+    y = int(rng.integers(0, height - qh))
+    x = int(rng.integers(0, width - qw))
+    canvas[y:y + qh, x:x + qw] = qr
+    return canvas
+
+
+def degrade(kind, qr, rng):
+    """Buat gambar uji dengan satu jenis degradasi
+
+    Return (img_bgr, params, jpeg_quality); jpeg_quality None berarti PNG.
+    """
+    params = {}
+    jpeg_quality = None
+
+    if kind == "large_canvas":
+        img = place_on_canvas(qr, LARGE_CANVAS_SIZE, rng)
+    else:
+        img = place_on_canvas(qr, CANVAS_SIZE, rng)
+
+    if kind == "rotation":
+        angle = float(rng.uniform(5, 355))
+        height, width = img.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (width, height), borderValue=215)
+        params["angle"] = round(angle, 1)
+    elif kind == "blur":
+        ksize = int(rng.choice([5, 7, 9]))
+        img = cv2.GaussianBlur(img, (ksize, ksize), 0)
+        params["ksize"] = ksize
+    elif kind == "perspective":
+        height, width = img.shape[:2]
+        shift = float(rng.uniform(0.05, 0.15))
+        src = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        dst = np.float32([[width * shift, height * shift / 2], [width * (1 - shift / 2), 0],
+                          [width, height], [0, height * (1 - shift / 2)]])
+        matrix = cv2.getPerspectiveTransform(src, dst)
+        img = cv2.warpPerspective(img, matrix, (width, height), borderValue=215)
+        params["shift"] = round(shift, 3)
+    elif kind == "jpeg":
+        jpeg_quality = int(rng.integers(15, 41))
+        params["quality"] = jpeg_quality
+    elif kind == "low_contrast":
+        contrast = float(rng.uniform(0.2, 0.35))
+        img = cv2.convertScaleAbs(img, alpha=contrast, beta=128 * (1 - contrast))
+        params["contrast"] = round(contrast, 2)
+
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR), params, jpeg_quality
+
+
+def random_id(rng):
+    """ID 14 digit acak dengan prefix kabupaten 3206"""
+    return "3206" + "".join(str(d) for d in rng.integers(0, 10, size=10))
+
+
+def generate_corpus(out_dir, count=DEFAULT_COUNT, seed=DEFAULT_SEED, degradations=DEGRADATIONS):
+    """Buat corpus: count payload × setiap degradasi, plus manifest JSON
+
+    Seed yang sama selalu menghasilkan gambar yang sama.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    items = []
+
+    for i in range(count):
+        angka14 = random_id(rng)
+        # Variasi format payload seperti di lapangan
+        payload = [angka14, f"ID:{angka14}", f"{angka14[:2]}-{angka14[2:6]}-{angka14[6:8]}-"
+                   f"{angka14[8:10]}-{angka14[10:]}"][i % 3]
+        qr = make_qr(payload, module_px=int(rng.integers(5, 10)))
+
+        for kind in degradations:
+            img, params, jpeg_quality = degrade(kind, qr, rng)
+            if jpeg_quality is None:
+                filename = f"{i:04d}_{kind}.png"
+                cv2.imwrite(os.path.join(out_dir, filename), img)
+            else:
+                filename = f"{i:04d}_{kind}.jpg"
+                cv2.imwrite(os.path.join(out_dir, filename), img,
+                            [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            items.append({"file": filename, "id": angka14, "payload": payload,
+                          "degradation": kind, "params": params})
+
+    manifest = {"seed": seed, "count": count, "degradations": list(degradations),
+                "opencv": cv2.__version__, "items": items}
+    with open(os.path.join(out_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(corpus_dir):
+    with open(os.path.join(corpus_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_detector(name):
+    """Fungsi decode path → qr_text untuk detector dengan nama ini"""
+    profile = DETECTORS[name]
+    if profile is None:
+        return lambda path: decode_qr_from_image(path)[0]
+    detector = StableQRDetector(profile)
+    return lambda path: detector.detect_qr_code(path)[0]
+
+
+def percentile(values, pct):
+    """Percentile nearest-rank dari list yang sudah terurut"""
+    if not values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[index]
+
+
+def bench_detector(name, corpus_dir, items):
+    """Jalankan satu detector pada seluruh corpus, return statistik"""
+    decode = make_detector(name)
+    latencies = []
+    hits = 0
+    per_degradation = {}
+
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        qr_text = decode(os.path.join(corpus_dir, item["file"]))
+        latencies.append(time.perf_counter() - t0)
+
+        ok = bool(qr_text) and extract_id(qr_text) == item["id"]
+        hits += ok
+        stats = per_degradation.setdefault(item["degradation"], {"total": 0, "hits": 0})
+        stats["total"] += 1
+        stats["hits"] += ok
+    elapsed = time.perf_counter() - start
+
+    for stats in per_degradation.values():
+        stats["recall"] = round(stats["hits"] / stats["total"], 4)
+
+    total = len(items)
+    latencies.sort()
+    return {
+        "images": total,
+        "elapsed_s": round(elapsed, 3),
+        "images_per_sec": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / total * 1000, 1) if total else 0.0,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "recall": round(hits / total, 4) if total else 0.0,
+        "per_degradation": per_degradation,
+    }
+
+
+def run_benchmark(corpus_dir, detectors=None, on_result=None):
+    """Benchmark semua detector pada corpus, return dict hasil (siap JSON)"""
+    manifest = load_manifest(corpus_dir)
+    detectors = detectors or list(DETECTORS)
+    results = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "corpus": {"path": os.path.abspath(corpus_dir), "seed": manifest["seed"],
+                   "count": manifest["count"], "images": len(manifest["items"])},
+        "detectors": {},
+    }
+    for name in detectors:
+        stats = bench_detector(name, corpus_dir, manifest["items"])
+        results["detectors"][name] = stats
+        if on_result:
+            on_result(name, stats)
+    return results
+
+
+def format_stats(name, stats):
+    return (f"{name:<10} {stats['images_per_sec']:>8.2f} img/s  "
+            f"mean {stats['mean_ms']:>8.1f} ms  p95 {stats['p95_ms']:>8.1f} ms  "
+            f"recall {stats['recall'] * 100:>5.1f}%")
+
+
+def compare(before, after):
+    """Baris perbandingan dua hasil benchmark (detector yang ada di keduanya)"""
+    lines = []
+    for name, new in after["detectors"].items():
+        old = before["detectors"].get(name)
+        if old is None:
+            continue
+        speedup = new["images_per_sec"] / old["images_per_sec"] if old["images_per_sec"] else 0.0
+        lines.append(f"{name:<10} throughput ×{speedup:.2f}  "
+                     f"p95 {old['p95_ms']:.1f} → {new['p95_ms']:.1f} ms  "
+                     f"recall {old['recall'] * 100:.1f}% → {new['recall'] * 100:.1f}%")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ws_bench",
+                                     description="Benchmark detector QR dengan corpus sintetis")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Buat corpus sintetis")
+    gen.add_argument("corpus", help="Folder output corpus")
+    gen.add_argument("--count", type=int, default=DEFAULT_COUNT,
+                     help="Jumlah payload (default: %(default)s)")
+    gen.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed (default: %(default)s)")
+    gen.add_argument("--degradations", nargs="+", choices=DEGRADATIONS, default=DEGRADATIONS,
+                     help="Jenis degradasi (default: semua)")
+
+    run = sub.add_parser("run", help="Benchmark detector pada corpus")
+    run.add_argument("corpus", help="Folder corpus dari 'generate'")
+    run.add_argument("--detectors", nargs="+", choices=list(DETECTORS), default=list(DETECTORS),
+                     help="Detector yang diukur (default: semua)")
+    run.add_argument("--output", help="Simpan hasil JSON ke path ini")
+
+    cmp_parser = sub.add_parser("compare", help="Bandingkan dua hasil JSON")
+    cmp_parser.add_argument("before")
+    cmp_parser.add_argument("after")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        manifest = generate_corpus(args.corpus, args.count, args.seed, args.degradations)
+        print(f"✅ {len(manifest['items'])} gambar dibuat di {args.corpus}")
+    elif args.command == "run":
+        if not os.path.exists(os.path.join(args.corpus, MANIFEST_FILENAME)):
+            parser.error(f"{MANIFEST_FILENAME} tidak ditemukan di {args.corpus}")
+        results = run_benchmark(args.corpus, args.detectors,
+                                on_result=lambda name, stats: print(format_stats(name, stats),
+                                                                    flush=True))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"📄 Hasil disimpan ke {args.output}")
+    else:
+        with open(args.before, "r", encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, "r", encoding="utf-8") as f:
+            after = json.load(f)
+        for line in compare(before, after):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+QR Decode Cache
+Cache hasil decode di disk (SQLite) berdasarkan hash isi file gambar
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Run ulang di folder yang sama hanya membayar deteksi untuk file baru atau
+yang isinya berubah. Yang disimpan:
+- isi QR yang berhasil didecode (berlaku untuk semua profile)
+- hasil "QR tidak ditemukan" beserta profile-nya (hanya berlaku untuk
+  profile yang sama, karena profile lain bisa mencoba lebih banyak variant)
+Hasil mode multi (semua QR per gambar) disimpan terpisah dari mode satu QR:
+hasil satu QR hanya berisi satu kode, jadi tidak boleh dipakai untuk multi.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+
+
+DEFAULT_MAX_ENTRIES = 500000
+DEFAULT_MAX_AGE_DAYS = 180
+
+# Penanda profile untuk hasil mode multi, mis. "stable+multi"
+MULTI_SUFFIX = "+multi"
+
+
+def hash_bytes(data):
+    """Hash isi file gambar (blake2b 160 bit, hex)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def cache_profile(profile, multi=False):
+    """Key profile di cache: mode multi punya entry sendiri"""
+    return profile + MULTI_SUFFIX if multi else profile
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+class DecodeCache:
+    """Cache decode QR di SQLite, key = hash isi file
+
+    Buka dengan readonly=True di worker process (hanya lookup); penulisan
+    dilakukan oleh satu proses (proses utama engine).
+    """
+
+    def __init__(self, path, readonly=False, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.readonly = readonly
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._pending = 0
+
+        if readonly:
+            if not os.path.exists(path):
+                self.conn = None
+                return
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+            return
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS decode_cache (
+                digest TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                qr_text TEXT,
+                detection TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (digest, profile)
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_decode_cache_last_used ON decode_cache (last_used)")
+        self.conn.commit()
+
+    def get(self, digest, profile, multi=False):
+        """Cari hasil decode untuk hash ini, return (qr_text, detection) atau None
+
+        Hasil positif dari profile apa pun dengan mode (multi atau tidak) yang
+        sama dipakai; hasil negatif hanya jika profile-nya juga sama.
+        """
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT qr_text, detection FROM decode_cache "
+                "WHERE digest = ? AND ((qr_text IS NOT NULL AND (profile LIKE ?) = ?) "
+                "OR profile = ?) "
+                "ORDER BY qr_text IS NULL LIMIT 1",
+                (digest, "%" + MULTI_SUFFIX, int(multi),
+                 cache_profile(profile, multi))).fetchone()
+        except sqlite3.Error:
+            return None
+        return row
+
+    def put(self, digest, profile, qr_text, detection, multi=False):
+        now = time.time()
+        profile = cache_profile(profile, multi)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO decode_cache "
+            "(digest, profile, qr_text, detection, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, profile, qr_text, detection, now, now))
+        self._maybe_commit()
+
+    def touch(self, digest):
+        """Tandai entry baru dipakai (untuk eviction berdasarkan umur)"""
+        self.conn.execute("UPDATE decode_cache SET last_used = ? WHERE digest = ?",
+                          (time.time(), digest))
+        self._maybe_commit()
+
+    def _maybe_commit(self):
+        # Commit per batch, bukan per file
+        self._pending += 1
+        if self._pending >= 200:
+            self.commit()
+
+    def commit(self):
+        if self.conn is not None and not self.readonly:
+            self.conn.commit()
+        self._pending = 0
+
+    def evict(self):
+        """Hapus entry yang terlalu lama tidak dipakai dan batasi jumlah entry"""
+        if self.conn is None or self.readonly:
+            return 0
+        removed = 0
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += self.conn.execute(
+                "DELETE FROM decode_cache WHERE last_used < ?", (cutoff,)).rowcount
+        if self.max_entries:
+            count = self.conn.execute("SELECT COUNT(*) FROM decode_cache").fetchone()[0]
+            if count > self.max_entries:
+                removed += self.conn.execute(
+                    "DELETE FROM decode_cache WHERE rowid IN ("
+                    "SELECT rowid FROM decode_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)).rowcount
+        self.commit()
+        return removed
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.commit()
+        self.conn.close()
+        self.conn = None
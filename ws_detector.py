@@ -0,0 +1,832 @@
+"""
+QR Detector Core
+Deteksi QR berbasis OpenCV tanpa ketergantungan ke Tkinter
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Modul ini dipakai oleh engine batch (ws_engine.py) maupun front end GUI,
+sehingga bisa dijalankan di server tanpa display.
+
+Profile deteksi:
+- basic     : gambar asli × 4 rotasi (seperti ws_rename.py)
+- simple    : 3 variants × 4 rotasi (seperti ws_rename_simple.py)
+- universal : 5 variants × 4 rotasi (seperti ws_rename_universal.py)
+- stable    : 14 variants × 5 thresholds × 4 rotasi (seperti ws_rename_stable.py)
+"""
+
+import os
+import json
+import time
+
+import cv2
+import numpy as np
+
+from ws_timing import StageTimer, NULL_TIMER
+
+
+ROTATIONS = [0, 90, 180, 270]
+THRESHOLDS = [127, 100, 150, 80, 200]
+
+# Urutan variant profile stable (upscaled/downscaled tergantung ukuran gambar)
+STABLE_VARIANTS = [
+    "original", "grayscale", "clahe_enhanced", "blurred", "adaptive_thresh",
+    "otsu_thresh", "thresh_100", "thresh_150", "morph_close", "morph_open",
+    "upscaled", "downscaled", "hist_equalized", "bilateral",
+]
+
+# Nama variant, threshold dan clipLimit CLAHE per profile (sama seperti
+# versi GUI asal masing-masing: simple/universal 2.0, stable 3.0)
+PROFILES = {
+    "basic": {
+        "variants": ["original"],
+        "thresholds": [],
+        "clahe_clip": 3.0,
+    },
+    "simple": {
+        "variants": ["original", "grayscale", "clahe_enhanced"],
+        "thresholds": [],
+        "clahe_clip": 2.0,
+    },
+    "universal": {
+        "variants": ["original", "grayscale", "clahe_enhanced", "thresh_127", "otsu_thresh"],
+        "thresholds": [],
+        "clahe_clip": 2.0,
+    },
+    "stable": {
+        "variants": STABLE_VARIANTS,
+        "thresholds": THRESHOLDS,
+        "clahe_clip": 3.0,
+    },
+}
+
+DEFAULT_PROFILE = "stable"
+
+# Lokalisasi QR: cari region sekali di gambar kecil, lalu decode hanya di crop
+ROI_MIN_SIZE = 1000      # gambar dengan sisi terpanjang di atas ini memakai ROI
+LOCATE_MAX_SIDE = 800    # ukuran gambar kecil untuk lokalisasi
+ROI_PADDING = 0.25       # padding crop relatif terhadap ukuran region
+
+# Resolution pyramid: decode di resolusi kecil dulu (JPEG decoder melewati
+# sebagian besar IDCT), naik ke resolusi penuh hanya jika gagal
+PYRAMID_LEVELS = [
+    ("1/4", cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    ("1/2", cv2.IMREAD_REDUCED_GRAYSCALE_2),
+]
+FULL_LEVEL = "full"
+
+READ_ERROR_INFO = "❌ Tidak bisa membaca gambar"
+NO_QR_INFO = "❌ OpenCV detector gagal dengan semua varian"
+BUDGET_INFO = "⏱️ Budget waktu habis sebelum QR ditemukan"
+CANCELLED_INFO = "⏹️ Pencarian dibatalkan"
+
+# Kernel morfologi (dibuat sekali, bukan per variant)
+KERNEL_2 = np.ones((2, 2), np.uint8)
+KERNEL_3 = np.ones((3, 3), np.uint8)
+
+
+class BudgetExhausted(Exception):
+    """Budget waktu per gambar habis di tengah pencarian"""
+
+
+class SearchCancelled(BudgetExhausted):
+    """Pencarian dihentikan dari luar lewat cancel_event"""
+
+
+def rotate_image(img, angle, dst=None):
+    """Rotasi gambar terhadap titik tengah (ukuran output sama dengan input)
+
+    dst: array tujuan dengan shape yang sama (dipakai ulang, tanpa alokasi).
+    """
+    if angle == 0:
+        return img
+    h, w = img.shape[:2]
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    return cv2.warpAffine(img, M, (w, h), dst=dst)
+
+
+def decode_qr_from_image(image_path):
+    """Decoder ws_rename.py: gambar asli × 4 rotasi dengan OpenCV QRCodeDetector
+
+    Tanpa tkinter, jadi bisa dipakai ws_bench di server headless. Return
+    (isi QR, info) seperti detect_qr_code; error dikembalikan di info.
+    """
+    img = cv2.imread(image_path)
+    if img is None:
+        return None, READ_ERROR_INFO
+    detector = cv2.QRCodeDetector()
+    try:
+        for angle in ROTATIONS:
+            data, _, _ = detector.detectAndDecode(rotate_image(img, angle))
+            if data and data.strip():
+                return data.strip(), f"✅ Berhasil dengan OpenCV(original,rot{angle})"
+    except cv2.error as e:
+        return None, f"❌ Error: {str(e)}"
+    return None, NO_QR_INFO
+
+
+class WorkBuffers:
+    """Array kerja uint8 yang dipakai ulang antar percobaan dan antar gambar
+
+    get(name, shape) mengembalikan array yang sama selama nama dan shape
+    sama, sehingga cvtColor/threshold/warpAffine menulis lewat dst= tanpa
+    alokasi baru. Selama satu gambar per nama disimpan beberapa shape
+    terakhir (level pyramid, crop ROI) supaya tidak bolak-balik alokasi.
+
+    Setelah gambar selesai trim() hanya menyisakan shape terakhir per nama,
+    dan semuanya dilepas jika totalnya di atas max_retained. Array kerja
+    gambar yang sedang diproses sudah dihitung MemoryGovernor; yang tersisa
+    antar gambar tidak, jadi dibatasi di sini.
+    """
+
+    MAX_SHAPES = 4
+    MAX_RETAINED_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_retained=MAX_RETAINED_BYTES):
+        self._buffers = {}
+        self.max_retained = max_retained
+        self.allocations = 0
+
+    def get(self, name, shape):
+        shapes = self._buffers.setdefault(name, {})
+        buf = shapes.pop(shape, None)
+        if buf is None:
+            if len(shapes) >= self.MAX_SHAPES:
+                shapes.pop(next(iter(shapes)))
+            buf = np.empty(shape, np.uint8)
+            self.allocations += 1
+        # Urutan dict = urutan pemakaian terakhir (yang terlama dibuang dulu)
+        shapes[shape] = buf
+        return buf
+
+    @property
+    def nbytes(self):
+        return sum(buf.nbytes for shapes in self._buffers.values() for buf in shapes.values())
+
+    def trim(self):
+        """Dipanggil setelah setiap gambar: batasi array yang disimpan antar gambar"""
+        for name, shapes in self._buffers.items():
+            if len(shapes) > 1:
+                last = next(reversed(shapes))
+                self._buffers[name] = {last: shapes[last]}
+        if self.nbytes > self.max_retained:
+            self.clear()
+
+    def clear(self):
+        self._buffers = {}
+
+
+class SearchOrder:
+    """Statistik hit (variant, rotasi, threshold) untuk mengurutkan pencarian
+
+    Setiap deteksi yang berhasil dicatat, lalu variant, rotasi dan threshold
+    diurutkan dari yang paling sering berhasil. Urutan default dipakai
+    sebagai tie-breaker, jadi tanpa statistik urutannya sama seperti semula.
+    """
+
+    def __init__(self):
+        self.variant_hits = {}
+        self.rotation_hits = {}
+        self.threshold_hits = {}
+        self.combo_hits = {}
+        self.total = 0
+
+    def record(self, variant, rotation, threshold=None):
+        """Catat satu kombinasi yang berhasil"""
+        self.total += 1
+        self.variant_hits[variant] = self.variant_hits.get(variant, 0) + 1
+        self.rotation_hits[rotation] = self.rotation_hits.get(rotation, 0) + 1
+        if threshold is not None:
+            self.threshold_hits[threshold] = self.threshold_hits.get(threshold, 0) + 1
+        combo = f"{variant},rot{rotation},thresh{threshold}"
+        self.combo_hits[combo] = self.combo_hits.get(combo, 0) + 1
+
+    def variants(self, names):
+        return sorted(names, key=lambda name: -self.variant_hits.get(name, 0))
+
+    def rotations(self, angles):
+        return sorted(angles, key=lambda angle: -self.rotation_hits.get(angle, 0))
+
+    def thresholds(self, values):
+        return sorted(values, key=lambda value: -self.threshold_hits.get(value, 0))
+
+    def merge(self, other):
+        """Gabungkan statistik dari SearchOrder lain"""
+        self.total += other.total
+        for mine, theirs in ((self.variant_hits, other.variant_hits),
+                             (self.rotation_hits, other.rotation_hits),
+                             (self.threshold_hits, other.threshold_hits),
+                             (self.combo_hits, other.combo_hits)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "variants": self.variant_hits,
+            "rotations": {str(k): v for k, v in self.rotation_hits.items()},
+            "thresholds": {str(k): v for k, v in self.threshold_hits.items()},
+            "combos": self.combo_hits,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        order = cls()
+        order.total = data.get("total", 0)
+        order.variant_hits = dict(data.get("variants", {}))
+        order.rotation_hits = {int(k): v for k, v in data.get("rotations", {}).items()}
+        order.threshold_hits = {int(k): v for k, v in data.get("thresholds", {}).items()}
+        order.combo_hits = dict(data.get("combos", {}))
+        return order
+
+    @classmethod
+    def load(cls, path):
+        """Baca statistik dari file JSON, SearchOrder kosong jika belum ada"""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class StableQRDetector:
+    """QR Detector yang hanya menggunakan OpenCV untuk stabilitas maksimal"""
+
+    def __init__(self, profile=DEFAULT_PROFILE, search_order=None, adaptive=True, use_roi=True,
+                 pyramid=False, multi=False, timing=False, budget_ms=None, reuse_buffers=True):
+        if profile not in PROFILES:
+            raise ValueError(f"Profile tidak dikenal: {profile}")
+        self.profile = profile
+        self.variant_names = PROFILES[profile]["variants"]
+        self.thresholds = PROFILES[profile]["thresholds"]
+        self.opencv_detector = cv2.QRCodeDetector()
+
+        # Urutan pencarian adaptif berdasarkan statistik hit
+        self.adaptive = adaptive
+        self.search_order = search_order if search_order is not None else SearchOrder()
+        self.last_hit = None
+
+        # Cari region QR dulu pada gambar besar
+        self.use_roi = use_roi
+
+        # Decode di resolusi kecil dulu, level yang berhasil dicatat di last_level
+        self.pyramid = pyramid
+        self.last_level = None
+
+        # Multi-QR: decode semua QR dalam satu gambar, hasil di last_codes
+        self.multi = multi
+        self.last_codes = []
+
+        # Timing per tahap (opt-in), hasil per gambar di last_timing
+        self.timer = StageTimer() if timing else NULL_TIMER
+        self.last_timing = None
+
+        # Budget waktu per gambar (ms); habis → BUDGET_INFO, bukan NO_QR_INFO
+        self.budget_ms = budget_ms
+        self._deadline = None
+
+        # threading.Event dari luar (mis. DetectorRace); begitu di-set,
+        # pencarian berhenti di percobaan berikutnya
+        self.cancel_event = None
+
+        # Array kerja per detector (= per worker) yang dipakai ulang lewat dst=
+        self.buffers = WorkBuffers() if reuse_buffers else None
+        self._clahe = cv2.createCLAHE(clipLimit=PROFILES[profile]["clahe_clip"],
+                                      tileGridSize=(8, 8))
+
+    def _buf(self, name, shape):
+        """Array kerja untuk dst=, None (OpenCV alokasi sendiri) jika reuse mati"""
+        if self.buffers is None:
+            return None
+        return self.buffers.get(name, tuple(shape))
+
+    def enhance_image_variants(self, img):
+        """Buat berbagai varian gambar untuk meningkatkan deteksi
+
+        Varian dibuat secara lazy (generator): setiap varian baru dihitung saat
+        pencarian benar-benar sampai ke varian tersebut, jadi gambar yang
+        langsung terbaca di 'original' tidak membayar preprocessing lainnya.
+
+        Varian ditulis ke satu array kerja yang sama; varian yang di-yield
+        hanya berlaku sampai varian berikutnya diminta. Dengan budget waktu
+        (varian disimpan untuk tahap threshold) setiap varian punya arraynya
+        sendiri.
+        """
+        cache = {}
+        names = self.variant_names
+        if self.adaptive:
+            names = self.search_order.variants(names)
+        keep = bool(self.budget_ms and self.thresholds)
+        for name in names:
+            self._check_budget()
+            with self.timer.measure("variant", name):
+                variant = self.make_variant(name, img, cache,
+                                            f"variant:{name}" if keep else "variant")
+            if variant is not None:
+                yield name, variant
+
+    def _gray(self, img, cache):
+        if 'gray' not in cache:
+            if len(img.shape) == 3:
+                cache['gray'] = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY,
+                                             dst=self._buf("gray", img.shape[:2]))
+            else:
+                cache['gray'] = img
+        return cache['gray']
+
+    def _adaptive_thresh(self, img, cache):
+        if 'adaptive_thresh' not in cache:
+            gray = self._gray(img, cache)
+            cache['adaptive_thresh'] = cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2,
+                dst=self._buf("adaptive_thresh", gray.shape))
+        return cache['adaptive_thresh']
+
+    def make_variant(self, name, img, cache, slot="variant"):
+        """Hitung satu varian gambar, None jika varian tidak berlaku untuk gambar ini
+
+        cache menyimpan hasil antara (grayscale, threshold adaptif) agar
+        tidak dihitung ulang oleh varian berikutnya. Hasil ditulis ke array
+        kerja bernama slot.
+        """
+        # Gambar asli
+        if name == 'original':
+            return img
+
+        # Convert ke grayscale jika colored
+        if name == 'grayscale':
+            if len(img.shape) == 3:
+                return self._gray(img, cache)
+            return None
+
+        gray = self._gray(img, cache)
+        h, w = gray.shape
+
+        # Tingkatkan kontras dengan CLAHE
+        if name == 'clahe_enhanced':
+            return self._clahe.apply(gray, dst=self._buf(slot, (h, w)))
+
+        # Gaussian blur untuk mengurangi noise
+        if name == 'blurred':
+            return cv2.GaussianBlur(gray, (3, 3), 0, dst=self._buf(slot, (h, w)))
+
+        # Threshold adaptif
+        if name == 'adaptive_thresh':
+            return self._adaptive_thresh(img, cache)
+
+        # Threshold dengan Otsu
+        if name == 'otsu_thresh':
+            _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                    dst=self._buf(slot, (h, w)))
+            return otsu
+
+        # Threshold dengan nilai tetap berbeda
+        if name in ('thresh_100', 'thresh_127', 'thresh_150'):
+            _, thresh = cv2.threshold(gray, int(name[-3:]), 255, cv2.THRESH_BINARY,
+                                      dst=self._buf(slot, (h, w)))
+            return thresh
+
+        # Morphological operations
+        if name == 'morph_close':
+            return cv2.morphologyEx(self._adaptive_thresh(img, cache), cv2.MORPH_CLOSE, KERNEL_2,
+                                    dst=self._buf(slot, (h, w)))
+
+        if name == 'morph_open':
+            return cv2.morphologyEx(self._adaptive_thresh(img, cache), cv2.MORPH_OPEN, KERNEL_3,
+                                    dst=self._buf(slot, (h, w)))
+
+        # Resize untuk ukuran yang berbeda
+        if name == 'upscaled':
+            if min(h, w) >= 400:
+                return None
+            # Jika terlalu kecil, perbesar
+            scale = 400 / min(h, w)
+            new_w, new_h = int(w * scale), int(h * scale)
+            return cv2.resize(gray, (new_w, new_h), dst=self._buf(slot, (new_h, new_w)),
+                              interpolation=cv2.INTER_CUBIC)
+
+        if name == 'downscaled':
+            if min(h, w) <= 1000:
+                return None
+            # Jika terlalu besar, kecilkan
+            scale = 800 / max(h, w)
+            new_w, new_h = int(w * scale), int(h * scale)
+            return cv2.resize(gray, (new_w, new_h), dst=self._buf(slot, (new_h, new_w)),
+                              interpolation=cv2.INTER_AREA)
+
+        # Histogram equalization
+        if name == 'hist_equalized':
+            return cv2.equalizeHist(gray, dst=self._buf(slot, (h, w)))
+
+        # Bilateral filter untuk noise reduction sambil preserve edges
+        if name == 'bilateral':
+            return cv2.bilateralFilter(gray, 9, 75, 75, dst=self._buf(slot, (h, w)))
+
+        raise ValueError(f"Varian tidak dikenal: {name}")
+
+    def _finder_pattern_boxes(self, small_gray):
+        """Cari kandidat finder pattern QR (kotak bersarang) dengan contours"""
+        _, binary = cv2.threshold(small_gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+                                  dst=self._buf("locate_binary", small_gray.shape))
+        contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy is None:
+            return []
+
+        boxes = []
+        hierarchy = hierarchy[0]
+        for i, contour in enumerate(contours):
+            # Finder pattern: kontur dengan minimal 2 level kontur anak
+            child = hierarchy[i][2]
+            depth = 0
+            while child != -1 and depth < 3:
+                depth += 1
+                child = hierarchy[child][2]
+            if depth < 2:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < 6 or h < 6 or not 0.6 < w / h < 1.6:
+                continue
+            if w > small_gray.shape[1] / 3 or h > small_gray.shape[0] / 3:
+                continue
+            boxes.append((x, y, w, h))
+        return boxes
+
+    def _group_finder_boxes(self, boxes):
+        """Kelompokkan finder pattern berukuran mirip yang berdekatan (≥3 = satu QR)"""
+        groups = []
+        used = set()
+        for i, (x, y, w, h) in enumerate(boxes):
+            if i in used:
+                continue
+            size = max(w, h)
+            cx, cy = x + w / 2, y + h / 2
+            members = []
+            for j, (x2, y2, w2, h2) in enumerate(boxes):
+                if j in used:
+                    continue
+                size2 = max(w2, h2)
+                dist = abs(x2 + w2 / 2 - cx) + abs(y2 + h2 / 2 - cy)
+                if 0.6 < size2 / size < 1.7 and dist < 12 * size:
+                    members.append(j)
+            if len(members) >= 3:
+                used.update(members)
+                groups.append((min(boxes[j][0] for j in members),
+                               min(boxes[j][1] for j in members),
+                               max(boxes[j][0] + boxes[j][2] for j in members),
+                               max(boxes[j][1] + boxes[j][3] for j in members)))
+        return groups
+
+    def locate_regions(self, img):
+        """Cari region QR kandidat sekali pada gambar yang diperkecil
+
+        Return list (x0, y0, x1, y1) dalam koordinat gambar asli, sudah diberi
+        padding dan dibuat persegi agar rotasi 90° tidak memotong QR.
+        """
+        h, w = img.shape[:2]
+        scale = min(1.0, LOCATE_MAX_SIDE / max(h, w))
+        size = (int(w * scale), int(h * scale))
+        if len(img.shape) == 3:
+            small = cv2.resize(img, size, dst=self._buf("locate_small", (size[1], size[0], 3)),
+                               interpolation=cv2.INTER_AREA)
+            small_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY,
+                                      dst=self._buf("locate_gray", small.shape[:2]))
+        else:
+            small_gray = cv2.resize(img, size, dst=self._buf("locate_gray", (size[1], size[0])),
+                                    interpolation=cv2.INTER_AREA)
+
+        rects = []
+        try:
+            ok, points = self.opencv_detector.detect(small_gray)
+        except cv2.error:
+            ok, points = False, None
+        if ok and points is not None:
+            for quad in points.reshape(-1, 4, 2):
+                x0, y0 = quad.min(axis=0)
+                x1, y1 = quad.max(axis=0)
+                rects.append((x0, y0, x1, y1))
+
+        if not rects:
+            # Fallback: kelompok finder pattern (3 kotak bersarang per QR)
+            rects = self._group_finder_boxes(self._finder_pattern_boxes(small_gray))
+
+        regions = []
+        for x0, y0, x1, y1 in rects:
+            # Kembali ke koordinat asli, persegi + padding
+            cx, cy = (x0 + x1) / 2 / scale, (y0 + y1) / 2 / scale
+            side = max(x1 - x0, y1 - y0) / scale
+            half = side * (0.5 + ROI_PADDING) + 16
+            rx0, ry0 = max(0, int(cx - half)), max(0, int(cy - half))
+            rx1, ry1 = min(w, int(cx + half)), min(h, int(cy + half))
+            if rx1 - rx0 < 16 or ry1 - ry0 < 16:
+                continue
+            # Region yang hampir sebesar gambar tidak menghemat apa pun
+            if (rx1 - rx0) * (ry1 - ry0) > 0.6 * w * h:
+                continue
+            regions.append((rx0, ry0, rx1, ry1))
+        return regions
+
+    def _start_budget(self):
+        """Mulai hitung budget, return True jika dimulai di sini (bukan nested)"""
+        if not self.budget_ms or self._deadline is not None:
+            return False
+        self._deadline = time.perf_counter() + self.budget_ms / 1000
+        return True
+
+    def _check_budget(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled()
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise BudgetExhausted()
+
+    def _hit(self, variant_name, angle, thresh_val=None):
+        """Catat kombinasi yang berhasil untuk mengurutkan pencarian berikutnya"""
+        self.last_hit = {"variant": variant_name, "rotation": angle, "threshold": thresh_val}
+        self.search_order.record(variant_name, angle, thresh_val)
+
+    def try_opencv_detector_comprehensive(self, img_variants, rotations=ROTATIONS, thresholds=None):
+        """Coba OpenCV QR detector dengan komprehensif
+
+        Dengan budget waktu semua variant × rotasi tanpa threshold (murah)
+        dicoba dulu, baru kemudian kombinasi threshold.
+        """
+        if thresholds is None:
+            thresholds = self.thresholds
+        if self.adaptive:
+            rotations = self.search_order.rotations(rotations)
+            thresholds = self.search_order.thresholds(thresholds)
+
+        if self.budget_ms and thresholds:
+            seen = []
+
+            def remember():
+                for item in img_variants:
+                    seen.append(item)
+                    yield item
+
+            method, result = self._search_variants(remember(), rotations, [])
+            if result:
+                return method, result
+            return self._search_variants(seen, rotations, thresholds, plain=False)
+
+        return self._search_variants(img_variants, rotations, thresholds)
+
+    def _search_variants(self, img_variants, rotations, thresholds, plain=True):
+        """Loop variant × rotasi (× threshold); plain=False melewati decode tanpa threshold"""
+        for variant_name, img in img_variants:
+            for angle in rotations:
+                try:
+                    with self.timer.measure("rotate", variant_name):
+                        rotated = rotate_image(img, angle,
+                                               self._buf(f"rotated{img.ndim}", img.shape))
+
+                    # Coba dengan detector standard
+                    if plain:
+                        self._check_budget()
+                        with self.timer.measure("decode", variant_name):
+                            data, bbox, _ = self.opencv_detector.detectAndDecode(rotated)
+                        if data and len(data.strip()) > 0:
+                            self._hit(variant_name, angle)
+                            return f"OpenCV({variant_name},rot{angle})", data.strip()
+
+                    if not thresholds:
+                        continue
+
+                    # Jika gagal, coba dengan detector yang lebih sensitif
+                    search_gray = self._search_gray(rotated)
+
+                    # Coba dengan threshold berbeda untuk detector; semua threshold
+                    # menulis ke array biner yang sama
+                    binary = self._buf("binary", search_gray.shape)
+                    for thresh_val in thresholds:
+                        self._check_budget()
+                        with self.timer.measure("threshold", variant_name):
+                            _, bin_img = cv2.threshold(search_gray, thresh_val, 255,
+                                                       cv2.THRESH_BINARY, dst=binary)
+                        with self.timer.measure("decode", variant_name):
+                            data, bbox, _ = self.opencv_detector.detectAndDecode(bin_img)
+                        if data and len(data.strip()) > 0:
+                            self._hit(variant_name, angle, thresh_val)
+                            return f"OpenCV({variant_name},rot{angle},thresh{thresh_val})", data.strip()
+
+                except BudgetExhausted:
+                    raise
+                except Exception as e:
+                    continue
+        return None, None
+
+    def _search_gray(self, rotated):
+        """Grayscale untuk tahap threshold (ke array kerja, tanpa alokasi)"""
+        if len(rotated.shape) == 3:
+            return cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY,
+                                dst=self._buf("search_gray", rotated.shape[:2]))
+        return rotated
+
+    def _decode_multi(self, img):
+        """detectAndDecodeMulti, return (codes, jumlah QR yang terlokalisasi)"""
+        ok, decoded_info, points, _ = self.opencv_detector.detectAndDecodeMulti(img)
+        if not ok or points is None:
+            return [], 0
+        # Urutkan seperti urutan baca (baris atas dulu, lalu kiri ke kanan)
+        band = max(1, img.shape[0] // 8)
+        found = sorted(
+            (int(quad[:, 1].min()) // band, int(quad[:, 0].min()), data.strip())
+            for data, quad in zip(decoded_info, points.reshape(-1, 4, 2))
+            if data and data.strip())
+        return [code for _, _, code in found], len(points)
+
+    def try_opencv_multi(self, img_variants, rotations=ROTATIONS):
+        """Decode semua QR dalam gambar dengan detectAndDecodeMulti
+
+        Pencarian berhenti begitu semua QR yang terlokalisasi berhasil didecode;
+        kode dari variant/rotasi berbeda digabung (tanpa duplikat).
+        """
+        thresholds = self.thresholds
+        if self.adaptive:
+            rotations = self.search_order.rotations(rotations)
+            thresholds = self.search_order.thresholds(thresholds)
+
+        codes = []
+        first_method = None
+        for variant_name, img in img_variants:
+            for angle in rotations:
+                try:
+                    with self.timer.measure("rotate", variant_name):
+                        rotated = rotate_image(img, angle,
+                                               self._buf(f"rotated{img.ndim}", img.shape))
+                    attempts = [(None, rotated)]
+                    if thresholds:
+                        search_gray = self._search_gray(rotated)
+                        binary = self._buf("binary", search_gray.shape)
+                        attempts += [(t, search_gray) for t in thresholds]
+
+                    for thresh_val, attempt_img in attempts:
+                        if thresh_val is not None:
+                            with self.timer.measure("threshold", variant_name):
+                                _, attempt_img = cv2.threshold(attempt_img, thresh_val, 255,
+                                                               cv2.THRESH_BINARY, dst=binary)
+                        self._check_budget()
+                        with self.timer.measure("decode", variant_name):
+                            found, located = self._decode_multi(attempt_img)
+                        new_codes = [code for code in found if code not in codes]
+                        if new_codes and first_method is None:
+                            first_method = f"OpenCV-Multi({variant_name},rot{angle}" + (
+                                f",thresh{thresh_val})" if thresh_val is not None else ")")
+                            self._hit(variant_name, angle, thresh_val)
+                        codes.extend(new_codes)
+                        if codes and len(codes) >= located:
+                            return first_method, codes
+
+                except BudgetExhausted:
+                    # Kode yang sudah didapat tetap dipakai
+                    if codes:
+                        return first_method, codes
+                    raise
+                except Exception as e:
+                    continue
+        return first_method, codes
+
+    def detect_qr_code(self, image_path):
+        """Deteksi QR code menggunakan OpenCV enhanced"""
+        return self._detect_from(lambda flags: cv2.imread(image_path, flags))
+
+    def detect_qr_bytes(self, data):
+        """Deteksi QR dari isi file gambar yang sudah dibaca ke memori"""
+        buf = np.frombuffer(data, np.uint8)
+        return self._detect_from(lambda flags: cv2.imdecode(buf, flags))
+
+    def _try_reduced_level(self, small):
+        """Pencarian murah di level pyramid: hanya rotasi tanpa threshold/variant
+
+        Gambar yang masih besar dibatasi ke region hasil lokalisasi.
+        """
+        if self.use_roi and max(small.shape[:2]) > ROI_MIN_SIZE:
+            with self.timer.measure("locate"):
+                regions = self.locate_regions(small)
+            for x0, y0, x1, y1 in regions:
+                method, result = self.try_opencv_detector_comprehensive(
+                    [('original', small[y0:y1, x0:x1])], thresholds=[])
+                if result:
+                    return method, result
+            return None, None
+        return self.try_opencv_detector_comprehensive([('original', small)], thresholds=[])
+
+    def _detect_from(self, read):
+        """Baca gambar lewat read(flags) lalu deteksi, dengan pyramid jika aktif"""
+        self.last_hit = None
+        self.last_level = None
+        self.last_codes = []
+        self.timer.reset()
+        started = self._start_budget()
+        try:
+            return self._detect_levels(read)
+        finally:
+            self.last_timing = self.timer.to_dict()
+            if started:
+                self._deadline = None
+            if self.buffers is not None:
+                self.buffers.trim()
+
+    def _detect_levels(self, read):
+        try:
+            if self.pyramid and not self.multi:
+                for level, flags in PYRAMID_LEVELS:
+                    with self.timer.measure("imread", level):
+                        small = read(flags)
+                    if small is None:
+                        break
+                    method, result = self._try_reduced_level(small)
+                    if result:
+                        self.last_level = level
+                        self.last_hit["level"] = level
+                        self.last_codes = [result]
+                        return result, f"✅ Berhasil dengan {method} @{level}"
+
+            with self.timer.measure("imread", FULL_LEVEL):
+                img = read(cv2.IMREAD_COLOR)
+            if img is None:
+                return None, READ_ERROR_INFO
+            result, info = self.detect_qr_image(img)
+            self.last_level = FULL_LEVEL
+            if self.last_hit is not None:
+                self.last_hit["level"] = FULL_LEVEL
+            return result, info
+
+        except BudgetExhausted as e:
+            return None, CANCELLED_INFO if isinstance(e, SearchCancelled) else BUDGET_INFO
+        except Exception as e:
+            return None, f"❌ Error: {str(e)}"
+
+    def detect_qr_image(self, img):
+        """Deteksi QR pada gambar (array BGR/grayscale) yang sudah dibaca
+
+        Dalam mode multi semua kode ada di last_codes dan yang dikembalikan
+        adalah kode pertama. Jika budget_ms habis sebelum QR ditemukan
+        hasilnya (None, BUDGET_INFO).
+        """
+        self.last_hit = None
+        self.last_codes = []
+        started = self._start_budget()
+        try:
+            if self.multi:
+                method, codes = self.try_opencv_multi(self.enhance_image_variants(img))
+                if codes:
+                    self.last_codes = codes
+                    return codes[0], f"✅ Berhasil dengan {method} ({len(codes)} QR)"
+                return None, NO_QR_INFO
+
+            # Gambar besar: lokalisasi sekali, lalu pencarian mahal hanya di crop
+            if self.use_roi and max(img.shape[:2]) > ROI_MIN_SIZE:
+                if self.budget_ms:
+                    # Dengan budget percobaan termurah (gambar asli, rotasi paling
+                    # sering berhasil) dulu; lokalisasi baru dibayar jika gagal
+                    rotations = ROTATIONS
+                    if self.adaptive:
+                        rotations = self.search_order.rotations(rotations)
+                    method, result = self._search_variants([('original', img)],
+                                                           rotations[:1], [])
+                    if result:
+                        self.last_codes = [result]
+                        return result, f"✅ Berhasil dengan {method}"
+                    self._check_budget()
+                with self.timer.measure("locate"):
+                    regions = self.locate_regions(img)
+                # Di crop hanya variant × rotasi tanpa threshold: jika gagal,
+                # pencarian lengkap di gambar penuh tetap dijalankan, jadi
+                # gambar yang tidak terbaca hanya membayar tambahan murah ini
+                for x0, y0, x1, y1 in regions:
+                    crop = img[y0:y1, x0:x1]
+                    method, result = self.try_opencv_detector_comprehensive(
+                        self.enhance_image_variants(crop), thresholds=[])
+                    if result:
+                        if self.last_hit is not None:
+                            self.last_hit["roi"] = [x0, y0, x1, y1]
+                        self.last_codes = [result]
+                        return result, f"✅ Berhasil dengan {method} (ROI)"
+
+            # Varian gambar dibuat lazy saat pencarian membutuhkannya
+            img_variants = self.enhance_image_variants(img)
+
+            # Coba deteksi komprehensif
+            method, result = self.try_opencv_detector_comprehensive(img_variants)
+            if result:
+                self.last_codes = [result]
+                return result, f"✅ Berhasil dengan {method}"
+
+            return None, NO_QR_INFO
+
+        except BudgetExhausted as e:
+            return None, CANCELLED_INFO if isinstance(e, SearchCancelled) else BUDGET_INFO
+        except Exception as e:
+            return None, f"❌ Error: {str(e)}"
+        finally:
+            if started:
+                self._deadline = None
+            if self.buffers is not None:
+                self.buffers.trim()
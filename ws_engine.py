@@ -0,0 +1,978 @@
+"""
+QR Batch Engine
+Engine batch tanpa GUI yang dipakai bersama oleh semua front end ws_rename_*
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Alur: walk folder → decode QR → cari pola 14 digit → rename ke [14digit]_2025.ext
+
+Penggunaan dari command line (tanpa display):
+    python -m ws_engine FOLDER [FOLDER ...] --profile stable --workers 8 --report laporan.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import string
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ws_detector import (StableQRDetector, SearchOrder, PROFILES, DEFAULT_PROFILE, NO_QR_INFO,
+                         BUDGET_INFO, READ_ERROR_INFO)
+from ws_cache import DecodeCache, hash_bytes, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_AGE_DAYS
+from ws_journal import ProgressJournal
+from ws_planner import RenamePlanner, atomic_move, PLANNED, DONE, CONFLICT
+from ws_index import IDIndex
+from ws_output import OutputTree, OUTPUT_MODES, OUTPUT_AUTO
+from ws_memory import MemoryGovernor, default_memory_limit, format_bytes
+from ws_timing import TimingReport, add_stage, DEFAULT_TOP_N
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+RENAME_SUFFIX = "_2025"
+
+# File statistik urutan pencarian yang disimpan di setiap folder input
+ORDER_FILENAME = ".ws_search_order.json"
+
+# Nama file yang sudah di-rename: [14digit]_2025.ext (atau beberapa ID, policy "all",
+# atau dengan suffix duplikat: [14digit]_2025_b.ext)
+RENAMED_NAME_RE = re.compile(r"^\d{14}(_\d{14})*" + re.escape(RENAME_SUFFIX) +
+                             r"(_[a-z]+)?\.(png|jpe?g)$", re.IGNORECASE)
+
+# Policy untuk ID duplikat yang target namanya sudah dipakai file lain (isi berbeda)
+DUP_SKIP = "skip"       # biarkan nama lama, status "exists"
+DUP_SUFFIX = "suffix"   # rename ke [14digit]_2025_b.ext, _c, ...
+DUPLICATE_POLICIES = (DUP_SKIP, DUP_SUFFIX)
+
+# Policy rename untuk gambar dengan beberapa QR (mode multi)
+MULTI_FIRST = "first"   # rename ke ID 14 digit pertama
+MULTI_ALL = "all"       # rename ke gabungan semua ID: [id1]_[id2]_2025.ext
+MULTI_COPY = "copy"     # rename ke ID pertama + satu salinan per ID lainnya
+MULTI_POLICIES = (MULTI_FIRST, MULTI_ALL, MULTI_COPY)
+
+# Pola 14 digit - lebih fleksibel
+ID_PATTERNS = [
+    r"(\d{14})",  # 14 digit berturut-turut
+    r"(\d{2}[-\s]*\d{4}[-\s]*\d{2}[-\s]*\d{2}[-\s]*\d{4})",  # dengan separator
+]
+
+# Status hasil per file
+STATUS_RENAMED = "renamed"
+STATUS_EXISTS = "exists"
+STATUS_NO_QR = "no_qr"
+STATUS_NO_PATTERN = "no_pattern"
+STATUS_RENAME_ERROR = "rename_error"
+STATUS_BUDGET = "budget_exhausted"
+STATUS_PLANNED = "planned"
+
+# Detection untuk file yang sudah bernama [14digit]_2025.ext di mode output
+NAMED_INFO = "⏭️ Nama sudah berisi ID (tanpa decode)"
+
+# Mode dua tahap: sweep cepat (gambar asli × 4 rotasi) untuk semua file dulu
+FAST_PROFILE = "basic"
+
+
+def is_renamed_name(filename):
+    """True jika nama file sudah berformat [14digit]_2025.ext"""
+    return RENAMED_NAME_RE.match(filename) is not None
+
+
+def ids_from_name(filename):
+    """ID 14 digit dari nama file yang sudah di-rename (tanpa decode), [] jika bukan"""
+    if not is_renamed_name(filename):
+        return []
+    return re.findall(r"\d{14}", filename.split(RENAME_SUFFIX)[0])
+
+
+def iter_image_files(input_folders, skip_renamed=False, on_renamed=None):
+    """Generator path file gambar dalam folder dan subfolder (os.scandir)
+
+    Path langsung di-yield begitu ditemukan, jadi decode bisa mulai sebelum
+    seluruh tree selesai dibaca (penting di network share yang lambat).
+    skip_renamed=True melewati file yang namanya sudah [14digit]_2025.ext;
+    path file tersebut dikirim ke on_renamed(path) jika diberikan.
+    """
+    if isinstance(input_folders, str):
+        input_folders = [input_folders]
+
+    for input_folder in input_folders:
+        stack = [input_folder]
+        while stack:
+            folder = stack.pop()
+            # Listing satu folder dibaca penuh dulu: rename yang terjadi
+            # selama decode tidak boleh mengubah listing yang sedang dibaca
+            files = []
+            subdirs = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        name = entry.name
+                        if not name.lower().endswith(IMAGE_EXTENSIONS):
+                            continue
+                        if skip_renamed and is_renamed_name(name):
+                            if on_renamed is not None:
+                                on_renamed(entry.path)
+                            continue
+                        files.append(entry.path)
+            except OSError:
+                continue
+            yield from files
+            # Subfolder diproses sesuai urutan listing
+            stack.extend(reversed(subdirs))
+
+
+def find_image_files(input_folders, skip_renamed=False):
+    """Kumpulkan semua file gambar dalam folder dan subfolder (list)"""
+    return list(iter_image_files(input_folders, skip_renamed))
+
+
+def extract_id(qr_text):
+    """Ambil angka 14 digit dari isi QR, atau None jika tidak ada"""
+    for pattern in ID_PATTERNS:
+        match = re.search(pattern, qr_text)
+        if match:
+            # Bersihkan angka dari separator
+            angka14 = re.sub(r'[^\d]', '', match.group(1))
+            if len(angka14) == 14:
+                return angka14
+    return None
+
+
+def build_new_name(file_path, angka14, suffix=None):
+    """Nama file baru: [14digit]_2025.ext, atau [14digit]_2025_[suffix].ext"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if suffix:
+        return f"{angka14}{RENAME_SUFFIX}_{suffix}{ext}"
+    return angka14 + RENAME_SUFFIX + ext
+
+
+def duplicate_suffixes():
+    """Suffix untuk ID duplikat: b, c, ..., z, aa, ab, ..."""
+    for length in itertools.count(1):
+        for letters in itertools.product(string.ascii_lowercase, repeat=length):
+            suffix = "".join(letters)
+            if suffix != "a":
+                yield suffix
+
+
+def rename_to_id(file_path, angka14, planner=None, deferred=False, duplicate_policy=DUP_SKIP):
+    """Rename file ke nama berbasis ID, return (status, new_name, error)
+
+    Dengan planner (RenamePlanner) bentrok dicek di memori dan rename
+    dicatat ke undo log; deferred=True hanya merencanakan (STATUS_PLANNED),
+    rename dijalankan nanti oleh planner.apply(). duplicate_policy=DUP_SUFFIX
+    memberi suffix _b, _c, ... jika nama sudah dipakai file yang isinya berbeda.
+    Jika planner punya folder output, file ditaruh di sana (file asli tetap).
+    """
+    new_name = build_new_name(file_path, angka14)
+    folder = os.path.dirname(file_path)
+
+    if planner is not None:
+        folder = planner.target_folder(file_path)
+        new_path = os.path.join(folder, new_name)
+        alternatives = None
+        if duplicate_policy == DUP_SUFFIX:
+            alternatives = (os.path.join(folder, build_new_name(file_path, angka14, suffix))
+                            for suffix in duplicate_suffixes())
+        entry = planner.add(file_path, new_path, angka14, alternatives)
+        if not deferred:
+            planner.apply([entry])
+        return entry_status(entry), os.path.basename(entry["dst"]), entry["error"]
+
+    new_path = os.path.join(folder, new_name)
+    try:
+        atomic_move(file_path, new_path)
+        return STATUS_RENAMED, new_name, None
+    except FileExistsError:
+        return STATUS_EXISTS, new_name, None
+    except Exception as e:
+        return STATUS_RENAME_ERROR, new_name, str(e)
+
+
+def entry_status(entry):
+    """Status record untuk entry RenamePlanner"""
+    if entry["status"] == DONE:
+        return STATUS_RENAMED
+    if entry["status"] == PLANNED:
+        return STATUS_PLANNED
+    if entry["status"] == CONFLICT:
+        return STATUS_EXISTS
+    return STATUS_RENAME_ERROR
+
+
+def copy_to_id(file_path, angka14, planner=None):
+    """Salin file ke nama berbasis ID di folder yang sama, return (new_name, error)
+
+    Dengan planner salinan ikut dicek bentrok di memori dan dicatat di undo log.
+    """
+    new_name = build_new_name(file_path, angka14)
+    new_path = os.path.join(os.path.dirname(file_path), new_name)
+    if planner is not None:
+        entry = planner.copy(file_path, new_path, angka14)
+        return new_name, entry["error"]
+    try:
+        if os.path.exists(new_path):
+            return new_name, "sudah ada"
+        shutil.copy2(file_path, new_path)
+        return new_name, None
+    except Exception as e:
+        return new_name, str(e)
+
+
+def extract_ids(codes):
+    """ID 14 digit unik dari beberapa isi QR, sesuai urutan"""
+    ids = []
+    for code in codes:
+        angka14 = extract_id(code)
+        if angka14 and angka14 not in ids:
+            ids.append(angka14)
+    return ids
+
+
+def apply_result(file_path, qr_text, detection_info, codes=None, multi_policy=MULTI_FIRST,
+                 planner=None, deferred=False, duplicate_policy=DUP_SKIP):
+    """Terapkan hasil deteksi ke satu file (rename) dan buat record laporan
+
+    codes berisi semua isi QR dalam gambar (mode multi); multi_policy
+    menentukan ID mana yang dipakai untuk rename (MULTI_POLICIES).
+    planner, deferred dan duplicate_policy diteruskan ke rename_to_id.
+    """
+    record = {
+        "file": file_path,
+        "status": STATUS_NO_QR,
+        "qr_text": qr_text,
+        "detection": detection_info,
+        "new_name": None,
+        "error": None,
+    }
+    if not qr_text:
+        if detection_info == BUDGET_INFO:
+            record["status"] = STATUS_BUDGET
+        return record
+
+    ids = extract_ids(codes or [qr_text])
+    if len(codes or []) > 1:
+        record["codes"] = codes
+        record["ids"] = ids
+    if not ids:
+        record["status"] = STATUS_NO_PATTERN
+        return record
+
+    name_id = "_".join(ids) if multi_policy == MULTI_ALL else ids[0]
+    status, new_name, error = rename_to_id(file_path, name_id, planner, deferred,
+                                           duplicate_policy)
+    record.update(status=status, new_name=new_name, error=error)
+    if planner is not None and planner.output is not None:
+        entry = planner.by_src[file_path]
+        record["output"] = entry["dst"]
+        record["method"] = entry.get("method")
+
+    if multi_policy == MULTI_COPY and status == STATUS_RENAMED and len(ids) > 1:
+        new_path = record.get("output") or os.path.join(os.path.dirname(file_path), new_name)
+        record["copies"] = []
+        for angka14 in ids[1:]:
+            copy_name, copy_error = copy_to_id(new_path, angka14, planner)
+            record["copies"].append({"new_name": copy_name, "error": copy_error})
+    return record
+
+
+def apply_decoded(decoded, multi_policy=MULTI_FIRST, planner=None, deferred=False,
+                  duplicate_policy=DUP_SKIP):
+    """apply_result untuk hasil iter_decode, ikut menyimpan info decode ke record"""
+    record = apply_result(decoded["file"], decoded["qr_text"], decoded["detection"],
+                          decoded.get("codes"), multi_policy, planner, deferred,
+                          duplicate_policy)
+    record["elapsed"] = round(decoded["elapsed"], 4)
+    record["hit"] = decoded.get("hit")
+    record["cached"] = decoded.get("cached", False)
+    record["level"] = decoded.get("level")
+    return record
+
+
+def index_record(index, record):
+    """Masukkan lokasi ID dari satu record ke IDIndex"""
+    status = record["status"]
+    if status not in (STATUS_RENAMED, STATUS_EXISTS):
+        return
+    ids = record.get("ids") or extract_ids([record["qr_text"]])
+    if status == STATUS_RENAMED:
+        path = record.get("output") or os.path.join(os.path.dirname(record["file"]),
+                                                    record["new_name"])
+    else:
+        # File yang tidak di-rename tetap berisi ID tersebut di nama lamanya
+        path = record["file"]
+    copies = record.get("copies")
+    if not copies:
+        for angka14 in ids:
+            index.add(angka14, path)
+        return
+    # --multi copy: setiap file hanya dicatat untuk ID di namanya sendiri;
+    # salinan yang gagal dibuat tetap menunjuk ke file utama
+    folder = os.path.dirname(path)
+    index.add(ids[0], path)
+    for copy, angka14 in zip(copies, ids[1:]):
+        if copy["error"]:
+            index.add(angka14, path)
+        else:
+            index.add(angka14, os.path.join(folder, copy["new_name"]))
+
+
+def is_definitive(record):
+    """False untuk kegagalan sementara (worker crash, file tidak terbaca, rename gagal)
+
+    Record seperti ini tidak dicatat ke journal, jadi --resume mencobanya lagi.
+    """
+    if record["status"] == STATUS_RENAME_ERROR:
+        return False
+    detection = record["detection"] or ""
+    return not (detection == READ_ERROR_INFO or detection.startswith("❌ Error"))
+
+
+def format_record(record):
+    """Format satu record menjadi baris log seperti di GUI"""
+    filename = os.path.basename(record["file"])
+    lines = [f"📷 {filename}: {record['detection']}"]
+    if record["qr_text"]:
+        lines.append(f"   📄 QR Content: '{record['qr_text']}'")
+
+    status = record["status"]
+    if status == STATUS_RENAMED and record.get("output"):
+        lines.append(f"   ✅ OUTPUT ({record['method']}): {record['output']}")
+    elif status == STATUS_RENAMED:
+        lines.append(f"   ✅ RENAMED ke: {record['new_name']}")
+        for copy in record.get("copies", []):
+            if copy["error"]:
+                lines.append(f"   ❌ Gagal salin ke {copy['new_name']}: {copy['error']}")
+            else:
+                lines.append(f"   ✅ SALINAN: {copy['new_name']}")
+    elif status == STATUS_EXISTS:
+        lines.append(f"   ⚠️  Skip (file {record['new_name']} sudah ada)")
+    elif status == STATUS_RENAME_ERROR:
+        lines.append(f"   ❌ Gagal rename: {record['error']}")
+    elif status == STATUS_NO_PATTERN:
+        lines.append(f"   ⚠️  Pattern 14 digit tidak ditemukan")
+    return "\n".join(lines) + "\n"
+
+
+def new_summary(total_files=0):
+    return {
+        "total": total_files,
+        "processed": 0,
+        "renamed": 0,
+        "exists": 0,
+        "failed_qr": 0,
+        "failed_pattern": 0,
+        "rename_error": 0,
+        "budget_exhausted": 0,
+    }
+
+
+def update_summary(summary, record):
+    summary["processed"] += 1
+    status = record["status"]
+    if status == STATUS_RENAMED:
+        summary["renamed"] += 1
+    elif status == STATUS_EXISTS:
+        summary["exists"] += 1
+    elif status == STATUS_NO_QR:
+        summary["failed_qr"] += 1
+    elif status == STATUS_NO_PATTERN:
+        summary["failed_pattern"] += 1
+    elif status == STATUS_RENAME_ERROR:
+        summary["rename_error"] += 1
+    elif status == STATUS_BUDGET:
+        summary["budget_exhausted"] += 1
+
+
+# --- Worker process -------------------------------------------------------
+
+_worker_detector = None
+_worker_cache = None
+
+
+def _init_worker(profile, search_order=None, cache_path=None, detector_options=None):
+    """Setiap worker punya detector (cv2.QRCodeDetector) sendiri"""
+    global _worker_detector, _worker_cache
+    if search_order is not None:
+        search_order = SearchOrder.from_dict(search_order)
+    _worker_detector = StableQRDetector(profile, search_order=search_order,
+                                        **(detector_options or {}))
+    # Worker hanya membaca cache, penulisan dilakukan proses utama
+    _worker_cache = DecodeCache(cache_path, readonly=True) if cache_path else None
+
+
+def _decode_in_worker(file_path):
+    start = time.perf_counter()
+    decoded = {"file": file_path, "hit": None, "cached": False, "digest": None, "level": None}
+    timing_enabled = _worker_detector.timer.enabled
+    read_time = None
+
+    if _worker_cache is None:
+        qr_text, detection_info = _worker_detector.detect_qr_code(file_path)
+        decoded["hit"] = _worker_detector.last_hit
+        decoded["level"] = _worker_detector.last_level
+        decoded["codes"] = _worker_detector.last_codes
+        decoded["timing"] = _worker_detector.last_timing
+    else:
+        try:
+            read_start = time.perf_counter()
+            with open(file_path, "rb") as f:
+                data = f.read()
+            read_time = time.perf_counter() - read_start
+        except OSError as e:
+            data = None
+            qr_text, detection_info = None, f"❌ Error: {str(e)}"
+
+        if data is not None:
+            digest = hash_bytes(data)
+            decoded["digest"] = digest
+            cached = _worker_cache.get(digest, _worker_detector.profile,
+                                       _worker_detector.multi)
+            if cached:
+                qr_text, detection_info = cached
+                detection_info = f"{detection_info} (cache)"
+                decoded["codes"] = qr_text.split("\n") if qr_text else []
+                # Sama seperti decode baru: qr_text = kode pertama
+                qr_text = decoded["codes"][0] if qr_text else qr_text
+                decoded["cached"] = True
+            else:
+                qr_text, detection_info = _worker_detector.detect_qr_bytes(data)
+                decoded["hit"] = _worker_detector.last_hit
+                decoded["level"] = _worker_detector.last_level
+                decoded["codes"] = _worker_detector.last_codes
+                decoded["timing"] = _worker_detector.last_timing
+        if timing_enabled and read_time is not None:
+            timing = decoded.get("timing") or {"stages": {}, "variants": {}}
+            decoded["timing"] = add_stage(timing, "read", read_time)
+
+    decoded.update(qr_text=qr_text, detection=detection_info,
+                   elapsed=time.perf_counter() - start)
+    return decoded
+
+
+def update_cache(cache, profile, decoded, multi=False):
+    """Simpan hasil decode baru ke cache (hanya hasil yang pasti)"""
+    digest = decoded.get("digest")
+    if not digest:
+        return
+    if decoded.get("cached"):
+        cache.touch(digest)
+    elif decoded["qr_text"] or decoded["detection"] == NO_QR_INFO:
+        # Semua kode disimpan dipisah baris agar mode multi tetap lengkap dari cache
+        qr_text = "\n".join(decoded.get("codes") or []) or decoded["qr_text"]
+        cache.put(digest, profile, qr_text, decoded["detection"], multi)
+
+
+def default_workers():
+    """Jumlah worker default: semua core CPU"""
+    return os.cpu_count() or 1
+
+
+def iter_decode(files, profile=DEFAULT_PROFILE, workers=1, search_order=None, cache_path=None,
+                detector_options=None, governor=None):
+    """Decode semua file, yield dict hasil decode per file
+
+    Dict berisi file, qr_text, detection, elapsed dan hit (kombinasi
+    variant/rotasi/threshold yang berhasil). Dengan workers > 1 decode
+    berjalan di process pool (setiap proses punya cv2.QRCodeDetector
+    sendiri) dan hasil keluar sesuai urutan selesai, bukan urutan input.
+
+    search_order (SearchOrder) menjadi urutan awal pencarian di setiap
+    worker; selanjutnya setiap worker belajar sendiri dari hit-nya.
+
+    Dengan cache_path worker mencari hasil di DecodeCache berdasarkan hash
+    isi file sebelum decode; dict hasil lalu berisi digest dan cached.
+
+    detector_options diteruskan ke StableQRDetector (mis. pyramid, use_roi).
+
+    Dengan governor (ws_memory.MemoryGovernor) file baru hanya dikirim ke
+    worker jika perkiraan byte piksel yang sedang diproses masih di bawah
+    batas; jika tidak, file ditahan sampai ada worker yang selesai.
+    """
+    if search_order is not None:
+        search_order = search_order.to_dict()
+
+    if workers <= 1:
+        _init_worker(profile, search_order, cache_path, detector_options)
+        for file_path in files:
+            reserved = governor.reserve(file_path) if governor is not None else None
+            try:
+                yield _decode_in_worker(file_path)
+            finally:
+                if reserved is not None:
+                    governor.release(reserved)
+        return
+
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(profile, search_order, cache_path,
+                                       detector_options)) as executor:
+        # Batasi jumlah file yang sedang diproses agar memori tetap kecil
+        max_pending = workers * 4
+        pending = {}
+        reserved = {}
+        held = []
+
+        def fill():
+            while len(pending) < max_pending:
+                file_path, estimate = held.pop() if held else (next(files, None), None)
+                if file_path is None:
+                    return
+                if governor is not None:
+                    if estimate is None:
+                        estimate = governor.estimate(file_path)
+                    size = governor.reserve(file_path, estimate)
+                    if size is None:
+                        # Batas memori tercapai: tunggu worker selesai dulu
+                        held.append((file_path, estimate))
+                        return
+                future = executor.submit(_decode_in_worker, file_path)
+                pending[future] = file_path
+                if governor is not None:
+                    reserved[future] = size
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = pending.pop(future)
+                if governor is not None:
+                    governor.release(reserved.pop(future))
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"file": file_path, "qr_text": None,
+                              "detection": f"❌ Error: {str(e)}", "elapsed": 0.0,
+                              "hit": None, "level": None, "cached": False, "digest": None,
+                              "codes": []}
+                yield result
+            fill()
+
+
+def load_search_order(input_folders):
+    """Gabungkan statistik urutan pencarian yang tersimpan di folder input"""
+    order = SearchOrder()
+    for input_folder in input_folders:
+        order.merge(SearchOrder.load(os.path.join(input_folder, ORDER_FILENAME)))
+    return order
+
+
+def save_search_order(input_folders, records):
+    """Tambahkan hit batch ini ke statistik urutan pencarian per folder input"""
+    for input_folder in input_folders:
+        path = os.path.join(input_folder, ORDER_FILENAME)
+        order = SearchOrder.load(path)
+        root = os.path.abspath(input_folder) + os.sep
+        for record in records:
+            hit = record.get("hit")
+            if hit and os.path.abspath(record["file"]).startswith(root):
+                order.record(hit["variant"], hit["rotation"], hit["threshold"])
+        try:
+            order.save(path)
+        except OSError:
+            pass
+
+
+def run_batch(input_folders, profile=DEFAULT_PROFILE, workers=1, report_path=None,
+              on_result=None, save_order=False, cache_path=None,
+              cache_max_entries=DEFAULT_MAX_ENTRIES, cache_max_age_days=DEFAULT_MAX_AGE_DAYS,
+              journal_path=None, resume=False, skip_renamed=True, on_start=None,
+              detector_options=None, multi_policy=MULTI_FIRST, timing_report=None,
+              two_pass=False, undo_path=None, plan=False, index_path=None,
+              duplicate_policy=DUP_SKIP, output_folder=None, output_mode=OUTPUT_AUTO,
+              memory_limit=None):
+    """Jalankan batch rename, return summary
+
+    File ditemukan sambil berjalan: summary["total"] bertambah selama
+    summary["discovering"] True dan baru final setelah walk selesai.
+    on_start(summary) dipanggil sekali sebelum decode dimulai dan
+    on_result(record, summary) dipanggil di proses utama untuk setiap file
+    yang selesai; dipakai GUI atau CLI untuk progress.
+
+    Dengan save_order=True statistik hit disimpan ke setiap folder input
+    (ORDER_FILENAME) dan dipakai sebagai urutan awal pada run berikutnya.
+
+    Dengan cache_path hasil decode disimpan di DecodeCache (SQLite) sehingga
+    run ulang hanya mendecode file yang baru atau berubah.
+
+    Dengan journal_path setiap file yang selesai dengan hasil pasti dicatat
+    ke ProgressJournal (bukan error sementara, lihat is_definitive);
+    resume=True melewati file yang sudah tercatat di journal tersebut.
+    skip_renamed melewati file yang namanya sudah [14digit]_2025.ext.
+    detector_options diteruskan ke StableQRDetector di setiap worker.
+    multi_policy menentukan rename untuk gambar dengan beberapa QR.
+    Dengan timing_report (TimingReport) detector mencatat waktu per tahap
+    dan hasil setiap file digabung ke report tersebut.
+
+    two_pass=True: tahap 1 memakai FAST_PROFILE untuk semua file dan langsung
+    me-rename yang berhasil; tahap 2 menjalankan profile penuh hanya untuk
+    file yang QR-nya belum terbaca. summary["pass"] berisi tahap yang
+    sedang berjalan dan setiap record berisi "pass".
+
+    Semua rename lewat RenamePlanner: bentrok target dan ID duplikat dicek
+    di memori, undo_path menyimpan undo log untuk rollback (ws_planner).
+    plan=True: decode semua file dulu, susun mapping old → new lengkap, lalu
+    rename sekaligus dalam satu pass; on_result dipanggil setelah rename.
+    duplicate_policy menentukan nama untuk ID duplikat (DUPLICATE_POLICIES).
+
+    Index ID → path (IDIndex) dibangun selama batch: dari nama file yang
+    sudah di-rename dan dari hasil rename run ini. summary["duplicate_ids"]
+    berisi jumlah ID yang ada di lebih dari satu file di seluruh tree;
+    index_path menyimpan index ke disk untuk lookup (ws_index).
+
+    Dengan output_folder file asli tidak di-rename: hasilnya ditaruh di
+    folder output (struktur subfolder sama) lewat hardlink/reflink/move/copy
+    sesuai output_mode (ws_output.OUTPUT_MODES). summary["methods"] berisi
+    jumlah file per cara yang dipakai. File yang sudah bernama
+    [14digit]_2025.ext ikut ditaruh di folder output dengan nama yang sama
+    (tanpa decode), sehingga folder output berisi set lengkap.
+
+    memory_limit (byte) membatasi perkiraan data piksel yang sedang diproses
+    semua worker (MemoryGovernor); summary["memory"] berisi batas, puncak
+    dan jumlah file yang sempat ditahan.
+    """
+    if isinstance(input_folders, str):
+        input_folders = [input_folders]
+
+    journal = None
+    if journal_path:
+        journal = ProgressJournal(journal_path, resume=resume)
+
+    if timing_report is not None:
+        detector_options = dict(detector_options or {}, timing=True)
+
+    output = OutputTree(input_folders, output_folder, output_mode) if output_folder else None
+    planner = RenamePlanner(undo_path, append=resume, output=output)
+    governor = MemoryGovernor(memory_limit, profile) if memory_limit else None
+    index = IDIndex()
+    summary = new_summary(0)
+    summary["skipped_done"] = 0
+    summary["discovering"] = True
+
+    named = []
+
+    def index_renamed(file_path):
+        if output is not None:
+            # Mode output: file yang sudah bernama ID tetap harus ada di folder output
+            named.append(file_path)
+            return
+        for angka14 in ids_from_name(os.path.basename(file_path)):
+            index.add(angka14, file_path)
+
+    def place_named():
+        """Taruh file yang sudah bernama ID ke folder output dengan nama yang sama"""
+        while named:
+            file_path = named.pop(0)
+            if journal is not None and journal.is_done(file_path):
+                summary["skipped_done"] += 1
+                continue
+            summary["total"] += 1
+            filename = os.path.basename(file_path)
+            ids = ids_from_name(filename)
+            entry = planner.add(file_path, os.path.join(planner.target_folder(file_path),
+                                                        filename), ids[0])
+            if not plan:
+                planner.apply([entry])
+            record = {"file": file_path, "status": entry_status(entry), "qr_text": None,
+                      "detection": NAMED_INFO, "new_name": os.path.basename(entry["dst"]),
+                      "error": entry["error"], "ids": ids, "output": entry["dst"],
+                      "method": entry.get("method")}
+            records.append(record)
+            if not plan:
+                finish_record(record)
+
+    def discover():
+        # Walk sekali; total bertambah sambil file dialirkan ke decode
+        for file_path in iter_image_files(input_folders, skip_renamed, index_renamed):
+            # Listing folder sudah ditutup saat file di-yield, aman untuk mode move
+            place_named()
+            if journal is not None and journal.is_done(file_path):
+                summary["skipped_done"] += 1
+                continue
+            summary["total"] += 1
+            yield file_path
+        place_named()
+        summary["discovering"] = False
+
+    if on_start:
+        on_start(summary)
+    records = []
+
+    def finish_record(record):
+        index_record(index, record)
+        if record.get("method"):
+            methods = summary.setdefault("methods", {})
+            methods[record["method"]] = methods.get(record["method"], 0) + 1
+        if journal is not None and is_definitive(record):
+            journal.record(record)
+        update_summary(summary, record)
+        if on_result:
+            on_result(record, summary)
+    start = time.perf_counter()
+    search_order = load_search_order(input_folders) if save_order else None
+    cache = None
+    if cache_path:
+        cache = DecodeCache(cache_path, max_entries=cache_max_entries,
+                            max_age_days=cache_max_age_days)
+        summary["cache_hits"] = 0
+
+    if journal is not None:
+        journal.start(folders=input_folders, profile=profile, workers=workers, resume=resume)
+
+    passes = [profile]
+    if two_pass and profile != FAST_PROFILE:
+        passes = [FAST_PROFILE, profile]
+
+    try:
+        pending_files = discover()
+        for pass_no, pass_profile in enumerate(passes, 1):
+            last_pass = pass_no == len(passes)
+            if two_pass:
+                summary["pass"] = pass_no
+            if governor is not None:
+                governor.use_profile(pass_profile)
+            retry = []
+
+            # Rename hanya dilakukan di proses utama agar counter tetap konsisten
+            for decoded in iter_decode(pending_files, pass_profile, workers, search_order,
+                                       cache_path, detector_options, governor):
+                if cache is not None:
+                    update_cache(cache, pass_profile, decoded,
+                                 bool((detector_options or {}).get("multi")))
+                    summary["cache_hits"] += decoded["cached"]
+                if timing_report is not None:
+                    timing_report.add(decoded["file"], decoded.get("timing"),
+                                      decoded["elapsed"], bool(decoded["qr_text"]))
+                if not decoded["qr_text"] and not last_pass:
+                    # QR belum terbaca: simpan untuk pencarian mendalam di tahap berikutnya
+                    retry.append(decoded["file"])
+                    continue
+
+                record = apply_decoded(decoded, multi_policy, planner, plan, duplicate_policy)
+                if two_pass:
+                    record["pass"] = pass_no
+                records.append(record)
+                if not plan:
+                    finish_record(record)
+            pending_files = retry
+
+        if plan:
+            # Mapping lengkap sudah ada: rename semua sekaligus
+            planner.apply()
+            for record in records:
+                if record["status"] == STATUS_PLANNED:
+                    entry = planner.by_src[record["file"]]
+                    record.update(status=entry_status(entry), error=entry["error"])
+                    if output is not None:
+                        record["method"] = entry.get("method")
+                finish_record(record)
+
+        if governor is not None:
+            summary["memory"] = governor.to_dict()
+        duplicates = index.duplicates()
+        summary["duplicate_ids"] = len(duplicates)
+        if index_path:
+            index.save(index_path, input_folders)
+        summary["elapsed"] = round(time.perf_counter() - start, 3)
+        if journal is not None:
+            journal.finish(summary)
+    finally:
+        planner.close()
+        if cache is not None:
+            cache.evict()
+            cache.close()
+        if journal is not None:
+            journal.close()
+
+    if save_order:
+        save_search_order(input_folders, records)
+
+    if report_path:
+        write_report(report_path, input_folders, profile, workers, summary, records,
+                     timing_report, duplicates)
+
+    return summary
+
+
+def write_report(report_path, input_folders, profile, workers, summary, records,
+                 timing_report=None, duplicates=None):
+    """Simpan laporan batch sebagai JSON"""
+    report = {
+        "folders": input_folders,
+        "profile": profile,
+        "workers": workers,
+        "summary": summary,
+        "files": records,
+    }
+    if duplicates:
+        report["duplicate_ids"] = duplicates
+    if timing_report is not None:
+        report["timing"] = timing_report.to_dict()
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def format_summary(summary):
+    total = summary["total"]
+    success_rate = (summary["renamed"] / total * 100) if total > 0 else 0
+    text = (f"=== RINGKASAN FINAL ===\n"
+            f"✅ Berhasil rename: {summary['renamed']}\n"
+            f"❌ QR tidak terbaca: {summary['failed_qr']}\n"
+            f"⚠️  QR terbaca tapi pattern tidak cocok: {summary['failed_pattern']}\n")
+    if summary.get("budget_exhausted"):
+        text += f"⏱️  Budget waktu habis: {summary['budget_exhausted']}\n"
+    if summary.get("methods"):
+        used = ", ".join(f"{method} {count}" for method, count in summary["methods"].items())
+        text += f"📁 Ke folder output: {used}\n"
+    memory = summary.get("memory")
+    if memory:
+        text += (f"🧠 Memori piksel puncak: {format_bytes(memory['peak'])} dari batas "
+                 f"{format_bytes(memory['limit'])} ({memory['waits']} file sempat ditahan)\n")
+    if summary.get("duplicate_ids"):
+        text += f"⚠️  ID yang sama di beberapa file: {summary['duplicate_ids']}\n"
+    return text + f"📊 Tingkat keberhasilan: {success_rate:.1f}%\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ws_engine",
+        description="Rename file gambar berdasarkan QR code 14 digit (tanpa GUI)")
+    parser.add_argument("folders", nargs="+", help="Folder input (diproses rekursif)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Profile deteksi (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Jumlah proses worker (default: jumlah CPU)")
+    parser.add_argument("--report", help="Simpan laporan JSON ke path ini")
+    parser.add_argument("--save-order", action="store_true",
+                        help=f"Simpan statistik urutan pencarian ke {ORDER_FILENAME} "
+                             f"di setiap folder dan pakai lagi di run berikutnya")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="Cache hasil decode (SQLite) berdasarkan hash isi file")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Jumlah maksimum entry cache (default: %(default)s)")
+    parser.add_argument("--cache-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Hapus entry cache yang tidak dipakai selama N hari "
+                             "(default: %(default)s)")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="Decode di resolusi 1/4 dan 1/2 dulu, resolusi penuh hanya jika gagal")
+    parser.add_argument("--no-roi", action="store_true",
+                        help="Jangan batasi pencarian ke region QR pada gambar besar")
+    parser.add_argument("--multi", choices=MULTI_POLICIES,
+                        help="Decode semua QR per gambar (detectAndDecodeMulti); policy rename: "
+                             "first = ID pertama, all = gabungan semua ID, "
+                             "copy = satu salinan per ID")
+    parser.add_argument("--budget-ms", type=float, metavar="MS",
+                        help="Batas waktu per gambar; pencarian murah dulu, file yang "
+                             "kehabisan waktu ditandai 'budget habis' (bukan 'QR tidak terbaca')")
+    parser.add_argument("--two-pass", action="store_true",
+                        help=f"Sweep cepat ({FAST_PROFILE}) untuk semua file dulu, pencarian "
+                             f"--profile hanya untuk file yang belum terbaca")
+    parser.add_argument("--undo-log", metavar="PATH",
+                        help="Catat semua rename ke undo log; batalkan dengan "
+                             "python -m ws_planner PATH")
+    parser.add_argument("--plan", action="store_true",
+                        help="Decode semua file dulu, cek bentrok di seluruh mapping, "
+                             "lalu rename sekaligus")
+    parser.add_argument("--duplicates", choices=DUPLICATE_POLICIES, default=DUP_SKIP,
+                        help="ID yang namanya sudah dipakai file lain (isi berbeda): "
+                             "skip = biarkan, suffix = [14digit]_2025_b.ext, _c, ... "
+                             "(default: %(default)s)")
+    parser.add_argument("--index", metavar="PATH",
+                        help="Simpan index ID → path seluruh tree ke SQLite; "
+                             "cari dengan python -m ws_index PATH ID")
+    parser.add_argument("--output", metavar="FOLDER",
+                        help="Jangan rename di tempat: taruh hasil di folder output "
+                             "(struktur subfolder sama), file asli tidak disentuh")
+    parser.add_argument("--output-mode", choices=sorted(OUTPUT_MODES), default=OUTPUT_AUTO,
+                        help="Cara menaruh file di --output: auto = hardlink, lalu reflink, "
+                             "lalu copy (default: %(default)s)")
+    parser.add_argument("--memory-limit", metavar="MB",
+                        help="Batas perkiraan data piksel yang diproses bersamaan oleh semua "
+                             "worker (MB), atau 'auto' = setengah RAM fisik; file baru ditahan "
+                             "selama batas tercapai")
+    parser.add_argument("--journal", metavar="PATH",
+                        help="Catat progress ke journal (JSON Lines) agar bisa dilanjutkan")
+    parser.add_argument("--resume", action="store_true",
+                        help="Lanjutkan run dari --journal, lewati file yang sudah selesai")
+    parser.add_argument("--include-renamed", action="store_true",
+                        help="Proses juga file yang sudah bernama [14digit]_2025.ext")
+    parser.add_argument("--timing", action="store_true",
+                        help="Catat waktu per tahap (imread, variant, rotate, decode) "
+                             "dan tampilkan ringkasan di akhir")
+    parser.add_argument("--timing-csv", metavar="PATH",
+                        help="Simpan timing per file ke CSV (mengaktifkan --timing)")
+    parser.add_argument("--timing-top", type=int, default=DEFAULT_TOP_N, metavar="N",
+                        help="Jumlah file paling lambat di ringkasan timing "
+                             "(default: %(default)s)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Jangan tampilkan log per file")
+    args = parser.parse_args(argv)
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            parser.error(f"Input folder tidak ditemukan: {folder}")
+    if args.resume and not args.journal:
+        parser.error("--resume membutuhkan --journal")
+    if args.output:
+        output = os.path.abspath(args.output)
+        for folder in args.folders:
+            folder = os.path.abspath(folder)
+            if output == folder or output.startswith(folder + os.sep):
+                parser.error("--output tidak boleh berada di dalam folder input")
+    memory_limit = None
+    if args.memory_limit == "auto":
+        memory_limit = default_memory_limit()
+    elif args.memory_limit:
+        try:
+            memory_limit = int(float(args.memory_limit) * 1024 * 1024)
+        except ValueError:
+            parser.error("--memory-limit harus angka (MB) atau 'auto'")
+    if args.plan and args.multi == MULTI_COPY:
+        parser.error("--plan tidak bisa digabung dengan --multi copy")
+
+    timing_report = TimingReport() if args.timing or args.timing_csv else None
+
+    def on_result(record, summary):
+        if not args.quiet:
+            print(format_record(record), flush=True)
+
+    summary = run_batch(args.folders, args.profile, args.workers, args.report, on_result,
+                        save_order=args.save_order, cache_path=args.cache,
+                        cache_max_entries=args.cache_max_entries,
+                        cache_max_age_days=args.cache_max_age_days,
+                        journal_path=args.journal, resume=args.resume,
+                        skip_renamed=not args.include_renamed,
+                        detector_options={"pyramid": args.pyramid, "use_roi": not args.no_roi,
+                                          "multi": bool(args.multi),
+                                          "budget_ms": args.budget_ms},
+                        multi_policy=args.multi or MULTI_FIRST,
+                        timing_report=timing_report, two_pass=args.two_pass,
+                        undo_path=args.undo_log, plan=args.plan, index_path=args.index,
+                        duplicate_policy=args.duplicates, output_folder=args.output,
+                        output_mode=args.output_mode, memory_limit=memory_limit)
+    print(format_summary(summary))
+    if timing_report is not None:
+        print(timing_report.format_report(args.timing_top))
+        if args.timing_csv:
+            timing_report.write_csv(args.timing_csv)
+            print(f"📄 Timing per file disimpan ke {args.timing_csv}")
+    if summary["total"] == 0:
+        print("Tidak ada file gambar yang ditemukan.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+QR ID Index
+Index ID 14 digit → path file untuk seluruh tree, disimpan di disk (SQLite)
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Index dibangun di memori selama batch berjalan: file yang sudah bernama
+[14digit]_2025.ext diambil ID-nya dari nama file (tanpa decode), file yang
+baru di-rename dari hasil QR. Di akhir batch index ditulis ke SQLite,
+sehingga pertanyaan "ID X ada di mana" dijawab langsung tanpa scan ulang:
+
+    python -m ws_index .ws_id_index.sqlite 32060000000000
+    python -m ws_index .ws_id_index.sqlite --duplicates
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+
+ID_INDEX_FILENAME = ".ws_id_index.sqlite"
+
+
+class IDIndex:
+    """Index ID → list path (urut sesuai ditemukan)"""
+
+    def __init__(self):
+        self.paths = {}
+        self._seen = set()
+
+    def add(self, angka14, path):
+        key = (angka14, os.path.normcase(os.path.abspath(path)))
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.paths.setdefault(angka14, []).append(path)
+
+    def get(self, angka14):
+        return list(self.paths.get(angka14, []))
+
+    def duplicates(self):
+        """ID yang ada di lebih dari satu file: {id: [path, ...]}"""
+        return {key: paths for key, paths in self.paths.items() if len(paths) > 1}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def save(self, path, folders=None):
+        """Tulis index ke SQLite (file baru, menggantikan index lama secara atomik)"""
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("CREATE TABLE ids (id TEXT NOT NULL, path TEXT NOT NULL)")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO ids VALUES (?, ?)",
+                             ((key, p) for key, paths in self.paths.items() for p in paths))
+            conn.execute("CREATE INDEX ids_id ON ids(id)")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("created", str(time.time())),
+                ("folders", os.pathsep.join(folders or [])),
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for angka14, file_path in conn.execute("SELECT id, path FROM ids ORDER BY rowid"):
+                index.add(angka14, file_path)
+        finally:
+            conn.close()
+        return index
+
+
+def lookup(index_path, ids):
+    """Path untuk setiap ID langsung dari file index: {id: [path, ...]}"""
+    found = {angka14: [] for angka14 in ids}
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        for angka14 in ids:
+            found[angka14] = [row[0] for row in conn.execute(
+                "SELECT path FROM ids WHERE id = ? ORDER BY rowid", (angka14,))]
+    finally:
+        conn.close()
+    return found
+
+
+def lookup_duplicates(index_path):
+    """Semua ID yang muncul di lebih dari satu file"""
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        duplicates = {}
+        rows = conn.execute(
+            "SELECT id, path FROM ids WHERE id IN "
+            "(SELECT id FROM ids GROUP BY id HAVING COUNT(*) > 1) ORDER BY id, rowid")
+        for angka14, path in rows:
+            duplicates.setdefault(angka14, []).append(path)
+    finally:
+        conn.close()
+    return duplicates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ws_index",
+        description="Cari lokasi file berdasarkan ID 14 digit dari index batch")
+    parser.add_argument("index", help=f"File index ({ID_INDEX_FILENAME})")
+    parser.add_argument("ids", nargs="*", help="ID 14 digit yang dicari")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="Tampilkan semua ID yang ada di lebih dari satu file")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.index):
+        parser.error(f"Index tidak ditemukan: {args.index}")
+    if not args.ids and not args.duplicates:
+        parser.error("Isi ID yang dicari atau pakai --duplicates")
+
+    missing = 0
+    for angka14, paths in lookup(args.index, args.ids).items():
+        if not paths:
+            print(f"❌ {angka14}: tidak ditemukan")
+            missing += 1
+            continue
+        print(f"✅ {angka14}:")
+        for path in paths:
+            print(f"   {path}")
+
+    if args.duplicates:
+        duplicates = lookup_duplicates(args.index)
+        print(f"=== ID DUPLIKAT: {len(duplicates)} ===")
+        for angka14, paths in duplicates.items():
+            print(f"⚠️  {angka14} ({len(paths)} file):")
+            for path in paths:
+                print(f"   {path}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
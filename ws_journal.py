@@ -0,0 +1,108 @@
+"""
+QR Progress Journal
+Journal append-only (JSON Lines) untuk melanjutkan batch yang terhenti
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Setiap file yang selesai diproses dengan hasil pasti (termasuk rename yang
+dilakukan) ditulis satu baris ke journal begitu selesai; file yang gagal
+karena error sementara tidak dicatat sehingga dicoba lagi saat resume. Jika batch mati di tengah jalan
+(listrik padam, jendela ditutup), mode resume membaca journal dan melewati
+file yang sudah selesai. Baris terakhir yang terpotong karena crash
+diabaikan.
+"""
+
+import os
+import json
+import time
+
+
+JOURNAL_FILENAME = ".ws_journal.jsonl"
+
+
+def read_journal(path):
+    """Baca semua entry journal, baris yang rusak/terpotong dilewati"""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def is_finished(path):
+    """True jika run terakhir di journal selesai dengan normal"""
+    last_start = None
+    finished = False
+    for entry in read_journal(path):
+        if entry.get("type") == "start":
+            last_start = entry
+            finished = False
+        elif entry.get("type") == "end":
+            finished = True
+    return last_start is None or finished
+
+
+class ProgressJournal:
+    """Journal progress batch
+
+    resume=True: entry lama dipertahankan dan file di dalamnya dianggap
+    selesai. resume=False: journal dimulai dari awal.
+    """
+
+    def __init__(self, path, resume=False, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.completed = set()
+        self._unsynced = 0
+
+        if resume:
+            for entry in read_journal(path):
+                if entry.get("type") == "file":
+                    self.completed.add(os.path.abspath(entry["file"]))
+
+        mode = "a" if resume else "w"
+        self._file = open(path, mode, encoding="utf-8")
+        if resume:
+            # Pastikan entry baru tidak menempel ke baris terakhir yang terpotong
+            self._file.write("\n")
+
+    def is_done(self, file_path):
+        return os.path.abspath(file_path) in self.completed
+
+    def _write(self, entry, sync=False):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def start(self, **info):
+        self._write(dict(type="start", time=time.time(), **info), sync=True)
+
+    def record(self, record):
+        """Catat satu file yang sudah selesai diproses"""
+        entry = {"type": "file"}
+        entry.update(record)
+        self._write(entry)
+        self.completed.add(os.path.abspath(record["file"]))
+
+    def finish(self, summary):
+        self._write({"type": "end", "time": time.time(), "summary": summary}, sync=True)
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
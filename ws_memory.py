@@ -0,0 +1,167 @@
+"""
+QR Memory Governor
+Batasi total data piksel yang sedang diproses oleh semua worker
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Sebelum file dikirim ke worker, ukuran gambar dibaca dari header PNG/JPEG
+(tanpa decode) dan dikalikan dengan jumlah array kerja yang dibuat profile
+deteksi per piksel. Selama total perkiraan file yang sedang diproses sudah
+mencapai batas, file berikutnya ditahan sampai ada worker yang selesai.
+Satu gambar yang lebih besar dari batas tetap diproses, tetapi sendirian.
+"""
+
+import os
+import sys
+import struct
+import ctypes
+
+
+# Perkiraan byte per piksel yang hidup bersamaan saat deteksi: gambar BGR (3),
+# salinan rotasi, grayscale, threshold adaptif, variant dan gambar biner
+BYTES_PER_PIXEL = {
+    "basic": 6,
+    "simple": 8,
+    "universal": 8,
+    "stable": 12,
+}
+DEFAULT_BYTES_PER_PIXEL = 12
+
+# Tanpa header yang terbaca: JPEG foto kira-kira 1/10 ukuran BGR-nya
+FALLBACK_PIXELS_PER_BYTE = 3
+
+# Batas default: sebagian RAM fisik, sisanya untuk OS dan aplikasi lain
+DEFAULT_RAM_FRACTION = 0.5
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(path):
+    """(width, height) dari header PNG/JPEG tanpa decode, None jika tidak terbaca"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(24)
+            if head[:8] == b"\x89PNG\r\n\x1a\n" and len(head) >= 24:
+                return struct.unpack(">II", head[16:24])
+            if head[:2] != b"\xff\xd8":
+                return None
+
+            # JPEG: lompati segment (EXIF, thumbnail, ...) sampai SOF
+            f.seek(2)
+            while True:
+                byte = f.read(1)
+                while byte and byte != b"\xff":
+                    byte = f.read(1)
+                while byte == b"\xff":
+                    byte = f.read(1)
+                if not byte:
+                    return None
+                marker = byte[0]
+                if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                    continue
+                if marker == 0xD9:
+                    return None
+                length = f.read(2)
+                if len(length) < 2:
+                    return None
+                if marker in JPEG_SOF_MARKERS:
+                    data = f.read(5)
+                    if len(data) < 5:
+                        return None
+                    height, width = struct.unpack(">HH", data[1:5])
+                    return width, height
+                f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def physical_memory():
+    """Total RAM fisik dalam byte, None jika tidak diketahui"""
+    if sys.platform == "win32":
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong),
+                        ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong),
+                        ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong),
+                        ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_memory_limit():
+    """Batas default: DEFAULT_RAM_FRACTION dari RAM fisik (None jika tidak diketahui)"""
+    total = physical_memory()
+    return int(total * DEFAULT_RAM_FRACTION) if total else None
+
+
+def format_bytes(count):
+    return f"{count / (1024 * 1024):.0f} MB"
+
+
+class MemoryGovernor:
+    """Penghitung byte piksel in-flight untuk semua worker (dipakai di proses utama)
+
+    reserve(path) mengembalikan perkiraan byte file tersebut, atau None jika
+    batas sudah tercapai (file harus ditahan); release(bytes) saat selesai.
+    """
+
+    def __init__(self, limit_bytes, profile="stable"):
+        self.limit = limit_bytes
+        self.use_profile(profile)
+        self.in_flight = 0
+        self.peak = 0
+        self.waits = 0
+        self.largest = 0
+        self._held = None
+
+    def use_profile(self, profile):
+        """Ganti faktor byte per piksel (mis. antar tahap mode dua tahap)"""
+        self.bytes_per_pixel = BYTES_PER_PIXEL.get(profile, DEFAULT_BYTES_PER_PIXEL)
+
+    def estimate(self, path):
+        """Perkiraan byte yang dipakai saat mendeteksi file ini"""
+        try:
+            file_size = os.path.getsize(path)
+        except OSError:
+            file_size = 0
+        dims = image_dimensions(path)
+        if dims:
+            pixels = dims[0] * dims[1]
+        else:
+            pixels = file_size * FALLBACK_PIXELS_PER_BYTE
+        # Isi file ikut di memori saat didecode dari bytes (cache)
+        return pixels * self.bytes_per_pixel + file_size
+
+    def reserve(self, path, estimate=None):
+        if estimate is None:
+            estimate = self.estimate(path)
+        # Gambar yang lebih besar dari batas boleh masuk jika tidak ada yang lain
+        if self.in_flight and self.in_flight + estimate > self.limit:
+            # waits = jumlah file yang pernah ditahan (bukan jumlah percobaan)
+            if path != self._held:
+                self._held = path
+                self.waits += 1
+            return None
+        self.in_flight += estimate
+        self.peak = max(self.peak, self.in_flight)
+        self.largest = max(self.largest, estimate)
+        return estimate
+
+    def release(self, reserved):
+        self.in_flight -= reserved
+
+    def to_dict(self):
+        return {"limit": self.limit, "peak": self.peak, "largest": self.largest,
+                "waits": self.waits}
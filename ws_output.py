@@ -0,0 +1,175 @@
+"""
+QR Output Tree
+Tulis hasil rename ke folder output terpisah, file asli tidak disentuh
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Struktur subfolder input dipertahankan di folder output. Isi gambar tidak
+disalin ulang jika bisa dihindari:
+- hardlink: nama baru untuk data yang sama (output di filesystem yang sama)
+- reflink: salinan copy-on-write (Btrfs, XFS, APFS), aman diedit terpisah
+- move: pindahkan file asli (jika file asli memang tidak perlu disimpan)
+- copy: salinan biasa, hanya sebagai pilihan terakhir
+Tidak ada mode yang menimpa file yang sudah ada di folder output.
+"""
+
+import os
+import sys
+import errno
+import shutil
+import ctypes
+import ctypes.util
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ws_planner import atomic_move
+
+
+METHOD_HARDLINK = "hardlink"
+METHOD_REFLINK = "reflink"
+METHOD_MOVE = "move"
+METHOD_COPY = "copy"
+
+OUTPUT_AUTO = "auto"
+# Urutan cara yang dicoba per mode; copy selalu yang terakhir
+OUTPUT_MODES = {
+    OUTPUT_AUTO: (METHOD_HARDLINK, METHOD_REFLINK, METHOD_COPY),
+    METHOD_HARDLINK: (METHOD_HARDLINK, METHOD_COPY),
+    METHOD_REFLINK: (METHOD_REFLINK, METHOD_COPY),
+    METHOD_MOVE: (METHOD_MOVE,),
+    METHOD_COPY: (METHOD_COPY,),
+}
+
+FICLONE = 0x40049409          # linux/fs.h: _IOW(0x94, 9, int)
+COPY_CHUNK = 1024 * 1024
+
+
+def _load_clonefile():
+    if sys.platform != "darwin":
+        return None
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).clonefile
+    except (OSError, AttributeError):
+        return None
+
+
+_clonefile = _load_clonefile()
+
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+
+def reflink(src, dst):
+    """Salinan copy-on-write: FICLONE (Linux) atau clonefile (macOS)"""
+    if _clonefile is not None:
+        if _clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+        return
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink tidak didukung", dst)
+
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def copy(src, dst):
+    """Salinan biasa, gagal (FileExistsError) jika dst sudah ada"""
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK)
+    shutil.copystat(src, dst)
+
+
+def move(src, dst):
+    try:
+        atomic_move(src, dst)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Beda filesystem: salin lalu hapus yang asli
+        copy(src, dst)
+        os.unlink(src)
+
+
+TRANSFERS = {
+    METHOD_HARDLINK: hardlink,
+    METHOD_REFLINK: reflink,
+    METHOD_MOVE: move,
+    METHOD_COPY: copy,
+}
+
+
+class OutputTree:
+    """Pemetaan folder input → folder output dan cara menaruh file di sana
+
+    Dipasang ke RenamePlanner(output=...): target rename menjadi
+    folder_for(src)/nama_baru dan transfer() menggantikan rename di tempat.
+    """
+
+    def __init__(self, input_folders, output_folder, mode=OUTPUT_AUTO):
+        if isinstance(input_folders, str):
+            input_folders = [input_folders]
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Mode output tidak dikenal: {mode}")
+        self.output_folder = os.path.abspath(output_folder)
+        self.mode = mode
+        self.roots = sorted((os.path.abspath(folder) for folder in input_folders),
+                            key=len, reverse=True)
+        # Beberapa folder input: masing-masing di subfolder output sesuai namanya
+        self.prefix_root = len(input_folders) > 1
+        self._unsupported = set()
+        self._created = set()
+
+    def folder_for(self, src):
+        """Folder output untuk file input src (struktur subfolder dipertahankan)"""
+        folder = os.path.dirname(os.path.abspath(src))
+        for root in self.roots:
+            if folder == root or folder.startswith(root + os.sep):
+                rel = os.path.relpath(folder, root)
+                parts = [self.output_folder]
+                if self.prefix_root:
+                    parts.append(os.path.basename(root))
+                if rel != os.curdir:
+                    parts.append(rel)
+                return os.path.join(*parts)
+        return self.output_folder
+
+    def transfer(self, src, dst):
+        """Taruh src di dst dengan cara termurah yang berhasil, return nama cara
+
+        Cara yang gagal karena tidak didukung (beda device, filesystem tanpa
+        hardlink/reflink) tidak dicoba lagi untuk file berikutnya.
+        """
+        folder = os.path.dirname(dst)
+        if folder not in self._created:
+            os.makedirs(folder, exist_ok=True)
+            self._created.add(folder)
+
+        methods = [m for m in OUTPUT_MODES[self.mode] if m not in self._unsupported]
+        error = None
+        for method in methods:
+            try:
+                TRANSFERS[method](src, dst)
+                return method
+            except FileExistsError:
+                raise
+            except OSError as e:
+                error = e
+                if method in (METHOD_HARDLINK, METHOD_REFLINK) and e.errno in (
+                        errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP,
+                        errno.EINVAL, errno.ENOTTY, errno.ENOSYS):
+                    self._unsupported.add(method)
+        raise error
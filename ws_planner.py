@@ -0,0 +1,296 @@
+"""
+QR Rename Planner
+Rencana rename old → new, deteksi bentrok, apply atomik dan undo log
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Semua target dicek di memori: listing setiap folder dibaca sekali
+(os.scandir) dan target yang sudah diklaim disimpan di dict, jadi tidak ada
+os.path.exists per file. Rename memakai atomic_move yang tidak pernah
+menimpa file lain, sehingga tetap aman walaupun beberapa proses me-rename
+di folder yang sama. Setiap rename dicatat ke undo log (JSON Lines)
+sebelum dijalankan; rollback membalik semuanya dengan satu perintah:
+
+    python -m ws_planner .ws_undo.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import filecmp
+import argparse
+
+
+UNDO_FILENAME = ".ws_undo.jsonl"
+
+# Status entry rencana
+PLANNED = "planned"
+DONE = "done"
+CONFLICT = "conflict"
+FAILED = "failed"
+
+
+def atomic_move(src, dst):
+    """Rename src → dst secara atomik tanpa menimpa dst (FileExistsError jika ada)
+
+    os.replace/os.rename di POSIX menimpa target diam-diam, jadi dipakai
+    os.link + os.unlink (link gagal jika target ada). Di Windows os.rename
+    sudah atomik dan menolak target yang ada.
+    """
+    if os.name == "nt":
+        os.rename(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Filesystem tanpa hardlink (FAT/exFAT, sebagian SMB)
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, "sudah ada", dst)
+        os.replace(src, dst)
+        return
+    os.unlink(src)
+
+
+class RenamePlanner:
+    """Rencana rename untuk satu batch
+
+    add() hanya memutuskan di memori (target bebas atau bentrok), apply()
+    menjalankan semua entry PLANNED dalam satu pass dan mencatatnya ke
+    undo log. rename() = add() + apply() untuk mode streaming.
+    append=True menambah ke undo log yang ada (batch yang dilanjutkan).
+    output (ws_output.OutputTree): file ditaruh di folder output lewat
+    output.transfer() dan file asli tidak di-rename. copy() membuat salinan
+    tambahan (mode multi copy) yang ikut dicek bentrok dan dicatat di undo log.
+    """
+
+    def __init__(self, undo_path=None, fsync_every=500, append=False, output=None):
+        self.undo_path = undo_path
+        self.append = append
+        self.output = output
+        self.fsync_every = fsync_every
+        self.entries = []
+        self.by_src = {}
+        self.targets = {}
+        self._listings = {}
+        self._undo = None
+        self._unsynced = 0
+
+    def _names(self, folder):
+        """Nama file di folder (normcase), dibaca sekali per folder"""
+        names = self._listings.get(folder)
+        if names is None:
+            try:
+                with os.scandir(folder) as entries:
+                    names = {os.path.normcase(entry.name) for entry in entries}
+            except OSError:
+                names = set()
+            self._listings[folder] = names
+        return names
+
+    def target_folder(self, src):
+        """Folder tujuan untuk src: folder yang sama, atau folder output"""
+        if self.output is not None:
+            return self.output.folder_for(src)
+        return os.path.dirname(src)
+
+    def _taken(self, target):
+        return (target in self.targets
+                or os.path.basename(target) in self._names(os.path.dirname(target)))
+
+    def _same_content(self, src, target):
+        """True jika src identik dengan file yang sudah memakai/mengklaim target"""
+        other = target if os.path.exists(target) else self.targets.get(target)
+        try:
+            return other is not None and filecmp.cmp(src, other, shallow=False)
+        except OSError:
+            return False
+
+    def add(self, src, dst, key=None, alternatives=None):
+        """Rencanakan src → dst, key (ID 14 digit) disimpan di entry
+
+        Jika dst sudah terpakai oleh file lain yang isinya berbeda, nama
+        dari alternatives (iterable path) dicoba berurutan; tanpa
+        alternatives, atau jika isinya identik, entry menjadi CONFLICT.
+        """
+        entry = {"src": src, "dst": dst, "id": key, "status": PLANNED, "error": None}
+        target = os.path.normcase(os.path.abspath(dst))
+
+        if self._taken(target):
+            if alternatives is None or self._same_content(src, target):
+                other = self.targets.get(target)
+                entry.update(status=CONFLICT,
+                             error=f"bentrok dengan {other}" if other else "sudah ada")
+            else:
+                for alt in alternatives:
+                    alt_target = os.path.normcase(os.path.abspath(alt))
+                    if not self._taken(alt_target):
+                        entry["dst"], target = alt, alt_target
+                        break
+
+        if entry["status"] == PLANNED:
+            self.targets[target] = src
+            self._names(os.path.dirname(target)).add(os.path.basename(target))
+
+        self.entries.append(entry)
+        self.by_src[src] = entry
+        return entry
+
+    def conflicts(self):
+        return [entry for entry in self.entries if entry["status"] == CONFLICT]
+
+    def _log(self, entry):
+        if self.undo_path is None:
+            return
+        if self._undo is None:
+            self._undo = open(self.undo_path, "a" if self.append else "w", encoding="utf-8")
+            self._log({"type": "begin", "time": time.time()})
+        self._undo.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._undo.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def _sync(self):
+        if self._undo is not None:
+            os.fsync(self._undo.fileno())
+        self._unsynced = 0
+
+    def apply(self, entries=None):
+        """Jalankan semua entry PLANNED (satu pass), return jumlah yang berhasil"""
+        done = 0
+        for entry in self.entries if entries is None else entries:
+            if entry["status"] != PLANNED:
+                continue
+            copying = entry.get("action") == "copy"
+            # Write-ahead: rollback mengabaikan entry yang file-nya tidak berpindah
+            self._log({"type": "rename" if self.output is None and not copying else "place",
+                       "src": entry["src"], "dst": entry["dst"]})
+            try:
+                if copying:
+                    # Import di sini: ws_output sendiri memakai atomic_move dari modul ini
+                    from ws_output import copy, METHOD_COPY
+                    copy(entry["src"], entry["dst"])
+                    entry["method"] = METHOD_COPY
+                elif self.output is None:
+                    atomic_move(entry["src"], entry["dst"])
+                else:
+                    entry["method"] = self.output.transfer(entry["src"], entry["dst"])
+            except FileExistsError:
+                entry.update(status=CONFLICT, error="sudah ada")
+            except OSError as e:
+                entry.update(status=FAILED, error=str(e))
+            else:
+                entry["status"] = DONE
+                done += 1
+        if entries is None:
+            self._sync()
+        return done
+
+    def rename(self, src, dst, key=None, alternatives=None):
+        """Rencanakan dan langsung jalankan satu rename, return entry"""
+        entry = self.add(src, dst, key, alternatives)
+        self.apply([entry])
+        return entry
+
+    def copy(self, src, dst, key=None):
+        """Rencanakan dan langsung buat salinan src → dst, return entry
+
+        Rollback menghapus salinan ini selama src masih ada.
+        """
+        entry = self.add(src, dst, key)
+        entry["action"] = "copy"
+        self.apply([entry])
+        return entry
+
+    def close(self):
+        if self._undo is not None:
+            self._sync()
+            self._undo.close()
+            self._undo = None
+
+
+def read_undo_log(path):
+    """Entry rename/place dari undo log, baris yang rusak/terpotong dilewati"""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("type") in ("rename", "place"):
+                entries.append(entry)
+    return entries
+
+
+def rollback(undo_path, dry_run=False, on_entry=None):
+    """Balik semua rename di undo log (urutan terbalik), return ringkasan
+
+    Entry dilewati jika target tidak ada atau nama asal sudah terpakai lagi,
+    jadi rollback aman dijalankan ulang. File di folder output (entry
+    "place") dihapus jika file asli masih ada, dikembalikan jika dipindah.
+    on_entry(entry, status) untuk log.
+    """
+    summary = {"restored": 0, "skipped": 0, "failed": 0}
+    for entry in reversed(read_undo_log(undo_path)):
+        src, dst = entry["src"], entry["dst"]
+        # Salinan/link di folder output: cukup dihapus, file asli tetap di tempat
+        remove = entry["type"] == "place" and os.path.lexists(src)
+        if not os.path.lexists(dst) or (os.path.lexists(src) and not remove):
+            status = "skipped"
+        elif dry_run:
+            status = "restored"
+        else:
+            try:
+                if remove:
+                    os.unlink(dst)
+                else:
+                    atomic_move(dst, src)
+                status = "restored"
+            except OSError as e:
+                entry["error"] = str(e)
+                status = "failed"
+        summary[status] += 1
+        if on_entry:
+            on_entry(entry, status)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ws_planner",
+        description="Rollback rename batch dari undo log")
+    parser.add_argument("undo_log", help=f"Undo log ({UNDO_FILENAME}) dari run sebelumnya")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Tampilkan apa yang akan dikembalikan tanpa me-rename")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Jangan tampilkan log per file")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.undo_log):
+        parser.error(f"Undo log tidak ditemukan: {args.undo_log}")
+
+    def on_entry(entry, status):
+        if args.quiet:
+            return
+        src, dst = os.path.basename(entry["src"]), os.path.basename(entry["dst"])
+        if status == "restored":
+            print(f"↩️  {dst} → {src}")
+        elif status == "failed":
+            print(f"❌ Gagal mengembalikan {dst}: {entry['error']}")
+
+    summary = rollback(args.undo_log, args.dry_run, on_entry)
+    print(f"=== ROLLBACK{' (dry run)' if args.dry_run else ''} ===\n"
+          f"↩️  Dikembalikan: {summary['restored']}\n"
+          f"⏭️  Dilewati: {summary['skipped']}\n"
+          f"❌ Gagal: {summary['failed']}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
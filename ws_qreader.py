@@ -0,0 +1,154 @@
+"""
+QR QReader Stage
+Deteksi QR dengan model QReader (CPU) yang dimuat sekali, decode di crop
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Model neural hanya dipakai untuk mencari lokasi QR: satu pass per gambar
+(banyak gambar digabung dalam satu batch inference). Model YOLO menerima
+array BGR seperti hasil cv2.imread, jadi konversi ke RGB hanya dilakukan
+untuk API qreader (fallback per gambar dan decode crop). Kotak hasil
+deteksi di-crop dari gambar asli lalu didecode dengan OpenCV
+(StableQRDetector) yang jauh lebih murah, bukan dengan mengulang pass
+neural untuk setiap variant dan rotasi.
+"""
+
+import cv2
+import numpy as np
+
+from ws_detector import StableQRDetector
+
+try:
+    from qreader import QReader
+except ImportError:
+    QReader = None
+
+
+DEFAULT_BATCH_SIZE = 8
+CROP_PADDING = 0.15      # padding crop relatif terhadap ukuran kotak deteksi
+CROP_PROFILE = "universal"
+
+
+class QReaderStage:
+    """Model QReader yang hangat (dimuat dan di-warm-up sekali per proses)"""
+
+    def __init__(self, model_size="s", min_confidence=0.5, batch_size=DEFAULT_BATCH_SIZE,
+                 warmup=True):
+        self.batch_size = batch_size
+        self.min_confidence = min_confidence
+        self.qreader = None
+        # Alasan batch inference tidak bisa dipakai (None = batch aktif)
+        self.batch_error = None
+        if QReader is not None:
+            self.qreader = QReader(model_size=model_size, min_confidence=min_confidence)
+            if warmup:
+                # Inference pertama membayar inisialisasi model, lakukan sekarang
+                self.detect_batch([np.full((64, 64, 3), 255, dtype=np.uint8)])
+        # Decoder murah untuk crop hasil deteksi
+        self.crop_decoder = StableQRDetector(CROP_PROFILE, use_roi=False)
+
+    @property
+    def available(self):
+        return self.qreader is not None
+
+    @staticmethod
+    def to_bgr(img):
+        """BGR 3 channel untuk model YOLO (gambar grayscale dikonversi sekali)"""
+        if len(img.shape) == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
+
+    @staticmethod
+    def to_rgb(img):
+        """RGB 3 channel untuk API qreader (detect/detect_and_decode)"""
+        if len(img.shape) == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    def detect_batch(self, bgr_images):
+        """Kotak QR (x0, y0, x1, y1, confidence) per gambar BGR, diurutkan dari yang paling yakin"""
+        boxes = []
+        for start in range(0, len(bgr_images), self.batch_size):
+            chunk = bgr_images[start:start + self.batch_size]
+            if self.batch_error is None:
+                try:
+                    boxes.extend(self._predict(chunk))
+                    continue
+                except (AttributeError, RuntimeError, ValueError) as e:
+                    # Versi qreader lain (tanpa detector.model) atau shape tidak
+                    # cocok: sisa run memakai detect per gambar
+                    self.batch_error = f"{type(e).__name__}: {e}"
+            boxes.extend(self._detect_each(chunk))
+        return boxes
+
+    def _predict(self, chunk):
+        # Satu inference YOLO untuk seluruh chunk (qreader → qrdet → ultralytics);
+        # ultralytics mengharapkan array BGR, sama seperti yang dikirim qrdet
+        model = self.qreader.detector.model
+        results = model.predict(source=list(chunk), conf=self.min_confidence, device="cpu",
+                                verbose=False)
+        boxes = []
+        for result in results:
+            xyxy = result.boxes.xyxy.cpu().numpy()
+            conf = result.boxes.conf.cpu().numpy()
+            found = [(float(x0), float(y0), float(x1), float(y1), float(c))
+                     for (x0, y0, x1, y1), c in zip(xyxy, conf)]
+            boxes.append(sorted(found, key=lambda box: box[4], reverse=True))
+        return boxes
+
+    def _detect_each(self, chunk):
+        boxes = []
+        for bgr in chunk:
+            found = []
+            try:
+                for detection in self.qreader.detect(image=self.to_rgb(bgr)):
+                    x0, y0, x1, y1 = detection["bbox_xyxy"]
+                    found.append((float(x0), float(y0), float(x1), float(y1),
+                                  float(detection.get("confidence", 0.0))))
+            except Exception:
+                pass
+            boxes.append(sorted(found, key=lambda box: box[4], reverse=True))
+        return boxes
+
+    def decode_boxes(self, img, boxes):
+        """Decode setiap kotak dengan OpenCV pada crop dari gambar asli
+
+        Hanya jika OpenCV gagal, QReader mendecode crop yang sama dalam RGB
+        (pass neural kecil pada crop, bukan pada seluruh gambar).
+        """
+        h, w = img.shape[:2]
+        codes = []
+        for x0, y0, x1, y1, _ in boxes:
+            pad = max(x1 - x0, y1 - y0) * CROP_PADDING
+            cx0, cy0 = max(0, int(x0 - pad)), max(0, int(y0 - pad))
+            cx1, cy1 = min(w, int(x1 + pad)), min(h, int(y1 + pad))
+            if cx1 - cx0 < 8 or cy1 - cy0 < 8:
+                continue
+            result, _ = self.crop_decoder.detect_qr_image(img[cy0:cy1, cx0:cx1])
+            if not result:
+                result = self._qreader_decode(self.to_rgb(img[cy0:cy1, cx0:cx1]))
+            if result and result not in codes:
+                codes.append(result)
+        return codes
+
+    def _qreader_decode(self, rgb_crop):
+        try:
+            for text in self.qreader.detect_and_decode(image=rgb_crop):
+                if text and text.strip():
+                    return text.strip()
+        except Exception:
+            pass
+        return None
+
+    def detect_and_decode_batch(self, images):
+        """Deteksi + decode banyak gambar (BGR/grayscale), return list of list isi QR"""
+        if not self.available:
+            return [[] for _ in images]
+        bgr_images = [self.to_bgr(img) for img in images]
+        all_boxes = self.detect_batch(bgr_images)
+        return [self.decode_boxes(img, boxes) for img, boxes in zip(images, all_boxes)]
+
+    def detect_and_decode(self, img):
+        """Isi QR dalam satu gambar (list, bisa kosong)"""
+        return self.detect_and_decode_batch([img])[0]
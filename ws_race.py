@@ -0,0 +1,74 @@
+"""
+QR Detector Race
+Jalankan beberapa backend deteksi bersamaan, hasil valid pertama menang
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+OpenCV, QReader dan ZXing dijalankan paralel di thread terpisah (ketiganya
+melepas GIL saat bekerja di kode native, jadi benar-benar memakai core
+berbeda). Begitu satu backend menemukan ID 14 digit, hasilnya langsung
+dikembalikan dan backend lain dibatalkan lewat cancel_event. Backend yang
+masih menyelesaikan satu panggilan native ditunggu di awal gambar
+berikutnya, bukan sebelum hasil dikembalikan.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class DetectorRace:
+    """Scheduler race: run(tasks) dengan tasks = [(nama, fn(cancel_event))]
+
+    fn mengembalikan (method, qr_text) seperti try_* di detector; fn yang
+    panjang sebaiknya memeriksa cancel_event secara berkala.
+    """
+
+    def __init__(self, max_workers=3):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="ws_race")
+        self._stragglers = []
+
+    def _join_stragglers(self):
+        # Backend yang kalah tidak boleh dipakai dua thread sekaligus
+        if self._stragglers:
+            wait(self._stragglers)
+            self._stragglers = []
+
+    def run(self, tasks):
+        """Return (method, qr_text); ID 14 digit pertama menang
+
+        Jika tidak ada yang berisi ID 14 digit, hasil non-kosong pertama
+        (QR terbaca tapi pattern tidak cocok) yang dikembalikan.
+        """
+        # Import di sini: ws_engine memuat seluruh batch engine
+        from ws_engine import extract_id
+
+        self._join_stragglers()
+        cancel = threading.Event()
+        pending = {self.executor.submit(fn, cancel): name for name, fn in tasks}
+        fallback = (None, None)
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        method, result = future.result()
+                    except Exception:
+                        continue
+                    if not result:
+                        continue
+                    if extract_id(result):
+                        return method or name, result
+                    if fallback[1] is None:
+                        fallback = (method or name, result)
+            return fallback
+        finally:
+            cancel.set()
+            self._stragglers = list(pending)
+
+    def close(self):
+        self._join_stragglers()
+        self.executor.shutdown(wait=True)
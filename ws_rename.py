@@ -1,81 +1,57 @@
 import os
-import cv2
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-
-def decode_qr_from_image(image_path):
-    """Baca QR code dari gambar menggunakan OpenCV QRCodeDetector"""
-    try:
-        img = cv2.imread(image_path)
-        if img is None:
-            return None
-
-        # Buat QR code detector
-        qr_detector = cv2.QRCodeDetector()
-        
-        # Coba decode dengan rotasi 0, 90, 180, 270 derajat
-        for angle in [0, 90, 180, 270]:
-            if angle != 0:
-                # Rotasi gambar
-                height, width = img.shape[:2]
-                center = (width // 2, height // 2)
-                rot_mat = cv2.getRotationMatrix2D(center, angle, 1.0)
-                img_rot = cv2.warpAffine(img, rot_mat, (width, height))
-            else:
-                img_rot = img
-            
-            # Coba decode QR code
-            data, bbox, rectified_qr = qr_detector.detectAndDecode(img_rot)
-            if data:
-                return data.strip()
-        
-        return None
-    except Exception as e:
-        print(f"Error membaca {image_path}: {e}")
-    return None
+from ws_detector import decode_qr_from_image
+from ws_engine import find_image_files, extract_id, rename_to_id, STATUS_RENAMED
+from ws_planner import RenamePlanner, UNDO_FILENAME
+from ws_output import OutputTree
 
 
 def process_files(input_folder, output_folder, progress_var, status_label, progress_win):
-    """Proses semua file dalam folder dan subfolder"""
+    """Proses semua file dalam folder dan subfolder
+
+    Jika output_folder diisi, file asli tidak di-rename: hasilnya ditaruh di
+    output_folder (hardlink, reflink, atau copy jika keduanya tidak bisa).
+    Semua rename dicatat ke undo log (UNDO_FILENAME) di folder input.
+    """
     if not os.path.exists(input_folder):
         messagebox.showerror("Error", "Input folder tidak ditemukan!")
         return
 
     # Hitung total file gambar
-    all_files = []
-    for root, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root, file))
+    all_files = find_image_files(input_folder)
 
     total_files = len(all_files)
     if total_files == 0:
         messagebox.showinfo("Info", "Tidak ada file gambar yang ditemukan.")
         return
 
+    output = OutputTree(input_folder, output_folder) if output_folder else None
+    planner = RenamePlanner(os.path.join(input_folder, UNDO_FILENAME), output=output)
+
     progress_var.set(0)
     current_file = 0
-    import re
     renamed = 0
-    for file_path in all_files:
-        qr_text = decode_qr_from_image(file_path)
-        if qr_text:
-            match = re.match(r"(\d{14})", qr_text)
-            if match:
-                angka14 = match.group(1)
-                ext = os.path.splitext(file_path)[1].lower()
-                new_name = angka14 + "_2025" + ext
-                save_path = os.path.join(os.path.dirname(file_path), new_name)
-                try:
-                    os.rename(file_path, save_path)
-                    renamed += 1
-                except Exception as e:
-                    print(f"Gagal rename {file_path}: {e}")
-        current_file += 1
-        progress_var.set(current_file)
-        status_label.config(text=f"{current_file}/{total_files} file diproses...")
-        progress_win.update_idletasks()
+    try:
+        for file_path in all_files:
+            qr_text, info = decode_qr_from_image(file_path)
+            if info.startswith("❌ Error"):
+                print(f"Error membaca {file_path}: {info}")
+            if qr_text:
+                angka14 = extract_id(qr_text)
+                if angka14:
+                    status, new_name, error = rename_to_id(file_path, angka14, planner)
+                    if status == STATUS_RENAMED:
+                        renamed += 1
+                    elif error:
+                        print(f"Gagal rename {file_path}: {error}")
+            current_file += 1
+            progress_var.set(current_file)
+            status_label.config(text=f"{current_file}/{total_files} file diproses...")
+            progress_win.update_idletasks()
+    finally:
+        planner.close()
 
     messagebox.showinfo("Selesai", f"Proses selesai! {renamed} file berhasil di-rename.")
 
@@ -87,12 +63,7 @@ def start_process(entry_input, entry_output, root):
         return
 
     # Hitung total file gambar
-    all_files = []
-    for root_dir, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root_dir, file))
-    total_files = len(all_files)
+    total_files = len(find_image_files(input_folder))
 
     # Buat jendela progress
     progress_win = tk.Toplevel(root)
@@ -107,7 +78,8 @@ def start_process(entry_input, entry_output, root):
     status_label.pack(pady=5)
     progress_win.update()
 
-    process_files(input_folder, None, progress_var, status_label, progress_win)
+    output_folder = entry_output.get() if entry_output else None
+    process_files(input_folder, output_folder, progress_var, status_label, progress_win)
 
 
 def browse_folder(entry):
@@ -120,14 +92,19 @@ def browse_folder(entry):
 def main():
     root = tk.Tk()
     root.title("QR File Renamer - (c) mdrj 2025 for BPS Tasikmalaya")
-    root.geometry("500x150")
+    root.geometry("500x230")
 
     tk.Label(root, text="Input Folder:").pack(pady=5)
     entry_input = tk.Entry(root, width=50)
     entry_input.pack(pady=5)
     tk.Button(root, text="Browse", command=lambda: browse_folder(entry_input)).pack()
 
-    tk.Button(root, text="Proses Rename", command=lambda: start_process(entry_input, None, root),
+    tk.Label(root, text="Output Folder (opsional, kosong = rename di tempat):").pack(pady=5)
+    entry_output = tk.Entry(root, width=50)
+    entry_output.pack(pady=5)
+    tk.Button(root, text="Browse", command=lambda: browse_folder(entry_output)).pack()
+
+    tk.Button(root, text="Proses Rename", command=lambda: start_process(entry_input, entry_output, root),
               bg="orange", fg="white").pack(pady=20)
 
     root.mainloop()
@@ -1,11 +1,14 @@
 import os
-import cv2
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
-import re
 import threading
 from datetime import datetime
 
+from ws_detector import StableQRDetector
+from ws_engine import find_image_files, extract_id, rename_to_id, STATUS_RENAMED, STATUS_EXISTS
+from ws_planner import RenamePlanner, UNDO_FILENAME
+from ws_ui import LogSink, UIEventQueue
+
 
 class SimpleQRRenamer:
     def __init__(self):
@@ -14,8 +17,10 @@ class SimpleQRRenamer:
         self.root.geometry("700x500")
         self.root.configure(bg="white")
         
-        self.detector = cv2.QRCodeDetector()
+        self.detector = StableQRDetector("simple")
         self.setup_ui()
+        # Thread proses hanya mengirim event; widget diupdate oleh main loop
+        self.ui = UIEventQueue(self.root, LogSink(self.log_text)).start()
         
     def setup_ui(self):
         # Header
@@ -76,80 +81,25 @@ class SimpleQRRenamer:
             self.log(f"📁 Folder dipilih: {folder}")
             
             # Hitung file
-            count = 0
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                        count += 1
+            count = len(find_image_files(folder))
             
             self.log(f"📊 Ditemukan {count} file gambar")
             self.status_label.config(text=f"Siap memproses {count} file gambar")
     
     def log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.ui.log(f"[{timestamp}] {message}\n")
     
     def detect_qr_simple(self, image_path):
-        """Deteksi QR dengan method enhanced tapi simple"""
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                return None
-            
-            # Coba berbagai preprocessing
-            variants = [img]
-            
-            # Grayscale
-            if len(img.shape) == 3:
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                variants.append(gray)
-                
-                # Enhanced contrast
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                enhanced = clahe.apply(gray)
-                variants.append(enhanced)
-            
-            # Coba deteksi dengan rotasi
-            for variant in variants:
-                for angle in [0, 90, 180, 270]:
-                    try:
-                        if angle != 0:
-                            if len(variant.shape) == 3:
-                                h, w = variant.shape[:2]
-                            else:
-                                h, w = variant.shape
-                            center = (w // 2, h // 2)
-                            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                            rotated = cv2.warpAffine(variant, M, (w, h))
-                        else:
-                            rotated = variant
-                        
-                        data, bbox, _ = self.detector.detectAndDecode(rotated)
-                        if data and len(data.strip()) > 0:
-                            return data.strip()
-                    except:
-                        continue
-            
-            return None
-        except:
-            return None
+        """Deteksi QR dengan method enhanced tapi simple (3 variants × 4 rotasi)"""
+        qr_text, _ = self.detector.detect_qr_code(image_path)
+        return qr_text
     
-    def process_files(self):
-        folder = self.folder_var.get()
-        if not folder:
-            messagebox.showerror("Error", "Pilih folder terlebih dahulu!")
-            return
-        
+    def process_files(self, folder):
         self.log("🚀 Memulai proses rename...")
         
         # Collect all image files
-        all_files = []
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                    all_files.append(os.path.join(root, file))
+        all_files = find_image_files(folder)
         
         total = len(all_files)
         renamed = 0
@@ -157,38 +107,41 @@ class SimpleQRRenamer:
         
         self.log(f"📊 Total file: {total}")
         
-        for i, file_path in enumerate(all_files, 1):
-            filename = os.path.basename(file_path)
-            self.status_label.config(text=f"Memproses {i}/{total}: {filename}")
-            
-            # Detect QR
-            qr_text = self.detect_qr_simple(file_path)
-            
-            if qr_text:
-                # Find 14 digit pattern
-                match = re.search(r"(\d{14})", qr_text)
-                if match:
-                    angka14 = match.group(1)
-                    ext = os.path.splitext(file_path)[1].lower()
-                    new_name = angka14 + "_2025" + ext
-                    new_path = os.path.join(os.path.dirname(file_path), new_name)
-                    
-                    try:
-                        if not os.path.exists(new_path):
-                            os.rename(file_path, new_path)
+        # Semua rename dicatat ke undo log agar bisa dibatalkan
+        undo_path = os.path.join(folder, UNDO_FILENAME)
+        planner = RenamePlanner(undo_path)
+        try:
+            for i, file_path in enumerate(all_files, 1):
+                filename = os.path.basename(file_path)
+                self.ui.set("status", self.status_label.config, text=f"Memproses {i}/{total}: {filename}")
+
+                # Detect QR
+                qr_text = self.detect_qr_simple(file_path)
+
+                if qr_text:
+                    # Find 14 digit pattern
+                    angka14 = extract_id(qr_text)
+                    if angka14:
+                        status, new_name, error = rename_to_id(file_path, angka14, planner)
+                        if status == STATUS_RENAMED:
                             renamed += 1
                             self.log(f"✅ {filename} → {new_name}")
-                        else:
+                        elif status == STATUS_EXISTS:
                             self.log(f"⚠️  {filename} → Skip (sudah ada)")
-                    except Exception as e:
+                        else:
+                            failed += 1
+                            self.log(f"❌ {filename} → Error: {error}")
+                    else:
                         failed += 1
-                        self.log(f"❌ {filename} → Error: {e}")
+                        self.log(f"⚠️  {filename} → QR: '{qr_text}' (bukan 14 digit)")
                 else:
                     failed += 1
-                    self.log(f"⚠️  {filename} → QR: '{qr_text}' (bukan 14 digit)")
-            else:
-                failed += 1
-                self.log(f"❌ {filename} → QR tidak terbaca")
+                    self.log(f"❌ {filename} → QR tidak terbaca")
+        finally:
+            planner.close()
+
+        if renamed:
+            self.log(f"↩️  Undo log: {undo_path} (batalkan: python -m ws_planner \"{undo_path}\")")
         
         # Summary
         self.log(f"\n🎉 SELESAI!")
@@ -196,21 +149,23 @@ class SimpleQRRenamer:
         self.log(f"❌ Gagal: {failed}")
         self.log(f"📊 Success rate: {(renamed/total*100):.1f}%")
         
-        self.status_label.config(text=f"Selesai! {renamed} file berhasil, {failed} gagal")
+        self.ui.set("status", self.status_label.config,
+                    text=f"Selesai! {renamed} file berhasil, {failed} gagal")
         
-        messagebox.showinfo("Selesai", 
-                           f"Proses selesai!\n\n"
-                           f"✅ Berhasil: {renamed}\n"
-                           f"❌ Gagal: {failed}\n"
-                           f"📊 Success rate: {(renamed/total*100):.1f}%")
+        self.ui.call(messagebox.showinfo, "Selesai", 
+                     f"Proses selesai!\n\n"
+                     f"✅ Berhasil: {renamed}\n"
+                     f"❌ Gagal: {failed}\n"
+                     f"📊 Success rate: {(renamed/total*100):.1f}%")
     
     def start_process(self):
-        if not self.folder_var.get():
+        folder = self.folder_var.get()
+        if not folder:
             messagebox.showerror("Error", "Pilih folder terlebih dahulu!")
             return
         
         # Run in thread to prevent UI freeze
-        thread = threading.Thread(target=self.process_files)
+        thread = threading.Thread(target=self.process_files, args=(folder,))
         thread.daemon = True
         thread.start()
     
@@ -18,281 +18,140 @@ Features:
 """
 
 import os
-import cv2
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import re
-import numpy as np
 import threading
+import multiprocessing
 
+from ws_detector import StableQRDetector
+from ws_engine import run_batch, format_record, format_summary, default_workers
+from ws_journal import JOURNAL_FILENAME, is_finished
+from ws_planner import UNDO_FILENAME
+from ws_index import ID_INDEX_FILENAME
+from ws_memory import default_memory_limit
+from ws_ui import LogSink, UIEventQueue, default_log_path
 
-class StableQRDetector:
-    """QR Detector yang hanya menggunakan OpenCV untuk stabilitas maksimal"""
-    
-    def __init__(self):
-        self.opencv_detector = cv2.QRCodeDetector()
-        
-    def enhance_image_variants(self, img):
-        """Buat berbagai varian gambar untuk meningkatkan deteksi"""
-        variants = []
-        
-        # Gambar asli
-        variants.append(('original', img))
-        
-        # Convert ke grayscale jika colored
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            variants.append(('grayscale', gray))
-        else:
-            gray = img.copy()
-            
-        # Tingkatkan kontras dengan CLAHE
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
-        variants.append(('clahe_enhanced', enhanced))
-        
-        # Gaussian blur untuk mengurangi noise
-        blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-        variants.append(('blurred', blurred))
-        
-        # Threshold adaptif
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
-        variants.append(('adaptive_thresh', thresh))
-        
-        # Threshold dengan Otsu
-        _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        variants.append(('otsu_thresh', otsu))
-        
-        # Threshold dengan nilai tetap berbeda
-        _, thresh_100 = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY)
-        variants.append(('thresh_100', thresh_100))
-        
-        _, thresh_150 = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-        variants.append(('thresh_150', thresh_150))
-        
-        # Morphological operations
-        kernel = np.ones((2,2), np.uint8)
-        morph_close = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        variants.append(('morph_close', morph_close))
-        
-        kernel3 = np.ones((3,3), np.uint8)
-        morph_open = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel3)
-        variants.append(('morph_open', morph_open))
-        
-        # Resize untuk ukuran yang berbeda
-        h, w = gray.shape
-        if min(h, w) < 400:  # Jika terlalu kecil, perbesar
-            scale = 400 / min(h, w)
-            new_w, new_h = int(w * scale), int(h * scale)
-            resized = cv2.resize(gray, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-            variants.append(('upscaled', resized))
-        
-        if min(h, w) > 1000:  # Jika terlalu besar, kecilkan
-            scale = 800 / max(h, w)
-            new_w, new_h = int(w * scale), int(h * scale)
-            resized = cv2.resize(gray, (new_w, new_h), interpolation=cv2.INTER_AREA)
-            variants.append(('downscaled', resized))
-        
-        # Histogram equalization
-        hist_eq = cv2.equalizeHist(gray)
-        variants.append(('hist_equalized', hist_eq))
-        
-        # Bilateral filter untuk noise reduction sambil preserve edges
-        bilateral = cv2.bilateralFilter(gray, 9, 75, 75)
-        variants.append(('bilateral', bilateral))
-        
-        return variants
-    
-    def try_opencv_detector_comprehensive(self, img_variants, rotations=[0, 90, 180, 270]):
-        """Coba OpenCV QR detector dengan komprehensif"""
-        for variant_name, img in img_variants:
-            for angle in rotations:
-                try:
-                    if angle != 0:
-                        if len(img.shape) == 3:
-                            h, w = img.shape[:2]
-                        else:
-                            h, w = img.shape
-                        center = (w // 2, h // 2)
-                        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                        rotated = cv2.warpAffine(img, M, (w, h))
-                    else:
-                        rotated = img
-                    
-                    # Coba dengan detector standard
-                    data, bbox, _ = self.opencv_detector.detectAndDecode(rotated)
-                    if data and len(data.strip()) > 0:
-                        return f"OpenCV({variant_name},rot{angle})", data.strip()
-                        
-                    # Jika gagal, coba dengan detector yang lebih sensitif
-                    # Gunakan findContours untuk cari area QR potensial
-                    if len(rotated.shape) == 3:
-                        search_gray = cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY)
-                    else:
-                        search_gray = rotated.copy()
-                    
-                    # Coba dengan threshold berbeda untuk detector
-                    for thresh_val in [127, 100, 150, 80, 200]:
-                        _, bin_img = cv2.threshold(search_gray, thresh_val, 255, cv2.THRESH_BINARY)
-                        data, bbox, _ = self.opencv_detector.detectAndDecode(bin_img)
-                        if data and len(data.strip()) > 0:
-                            return f"OpenCV({variant_name},rot{angle},thresh{thresh_val})", data.strip()
-                            
-                except Exception as e:
-                    continue
-        return None, None
-    
-    def detect_qr_code(self, image_path):
-        """Deteksi QR code menggunakan OpenCV enhanced"""
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                return None, "❌ Tidak bisa membaca gambar"
-            
-            # Buat berbagai varian gambar
-            img_variants = self.enhance_image_variants(img)
-            
-            # Coba deteksi komprehensif
-            method, result = self.try_opencv_detector_comprehensive(img_variants)
-            if result:
-                return result, f"✅ Berhasil dengan {method}"
-            
-            return None, "❌ OpenCV detector gagal dengan semua varian"
-            
-        except Exception as e:
-            return None, f"❌ Error: {str(e)}"
-
-
-def process_files_stable(input_folder, progress_var, status_label, progress_win, result_text):
-    """Proses files dengan stable detection (OpenCV only)"""
+
+def process_files_stable(input_folder, progress_var, status_label, ui, workers=1, resume=False,
+                         two_pass=False, progress_bar=None):
+    """Proses files dengan stable detection (OpenCV only)
+
+    Dengan workers > 1 decode berjalan paralel di beberapa proses; rename
+    dan counter tetap dikerjakan di sini sesuai urutan file selesai.
+    Progress dicatat ke journal di folder input; resume=True melewati file
+    yang sudah selesai pada run sebelumnya. two_pass=True me-rename semua
+    file yang mudah dulu (gambar asli × 4 rotasi), lalu pencarian 280
+    kombinasi hanya untuk sisanya.
+
+    Folder hanya di-walk sekali: decode mulai begitu file pertama ditemukan
+    dan maximum progress_bar ikut bertambah selama walk berjalan.
+
+    Berjalan di thread worker: semua update widget dikirim lewat ui
+    (UIEventQueue) dan dijalankan oleh main loop Tk.
+    """
     if not os.path.exists(input_folder):
-        messagebox.showerror("Error", "Input folder tidak ditemukan!")
+        ui.call(messagebox.showerror, "Error", "Input folder tidak ditemukan!")
+        ui.call(ui.close)
         return
 
-    # Initialize detector
-    detector = StableQRDetector()
-    
-    # Hitung total file gambar
-    all_files = []
-    for root, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root, file))
-
-    total_files = len(all_files)
-    if total_files == 0:
-        messagebox.showinfo("Info", "Tidak ada file gambar yang ditemukan.")
-        return
+    log_path = ui.log_sink.log_path if ui.log_sink else None
 
-    progress_var.set(0)
-    current_file = 0
-    renamed = 0
-    failed_qr = 0
-    failed_pattern = 0
-    
-    log_text = f"=== LAPORAN STABLE QR DETECTION ===\n"
-    log_text += f"Folder: {input_folder}\n"
-    log_text += f"Total file: {total_files}\n"
-    log_text += f"Detector: OpenCV Enhanced (14 variants + 5 thresholds + 4 rotations)\n\n"
-    
-    for file_path in all_files:
-        filename = os.path.basename(file_path)
-        log_text += f"📷 {filename}: "
-        
-        qr_text, detection_info = detector.detect_qr_code(file_path)
-        
-        if qr_text:
-            log_text += f"{detection_info}\n"
-            log_text += f"   📄 QR Content: '{qr_text}'\n"
-            
-            # Cari 14 digit pattern - lebih fleksibel
-            patterns = [
-                r"(\d{14})",  # 14 digit berturut-turut
-                r"(\d{2}[-\s]*\d{4}[-\s]*\d{2}[-\s]*\d{2}[-\s]*\d{4})",  # dengan separator
-                r"(\d{14})",  # fallback
-            ]
-            
-            match = None
-            for pattern in patterns:
-                match = re.search(pattern, qr_text)
-                if match:
-                    break
-            
-            if match:
-                # Bersihkan angka dari separator
-                angka14 = re.sub(r'[^\d]', '', match.group(1))
-                if len(angka14) == 14:
-                    ext = os.path.splitext(file_path)[1].lower()
-                    new_name = angka14 + "_2025" + ext
-                    new_path = os.path.join(os.path.dirname(file_path), new_name)
-                    
-                    try:
-                        if not os.path.exists(new_path):
-                            os.rename(file_path, new_path)
-                            renamed += 1
-                            log_text += f"   ✅ RENAMED ke: {new_name}\n"
-                        else:
-                            log_text += f"   ⚠️  Skip (file {new_name} sudah ada)\n"
-                    except Exception as e:
-                        log_text += f"   ❌ Gagal rename: {e}\n"
-                else:
-                    failed_pattern += 1
-                    log_text += f"   ⚠️  Pattern ditemukan tapi bukan 14 digit: '{angka14}'\n"
-            else:
-                failed_pattern += 1
-                log_text += f"   ⚠️  Pattern 14 digit tidak ditemukan\n"
-        else:
-            failed_qr += 1
-            log_text += f"{detection_info}\n"
+    def on_start(summary):
+        ui.set("progress", progress_var.set, 0)
         
-        log_text += "\n"
-        
-        current_file += 1
-        progress_var.set(current_file)
-        status_label.config(text=f"{current_file}/{total_files} | ✅{renamed} ❌{failed_qr} ⚠️{failed_pattern}")
-        progress_win.update_idletasks()
+        log_text = f"=== LAPORAN STABLE QR DETECTION ===\n"
+        log_text += f"Folder: {input_folder}\n"
+        log_text += f"Total file: dihitung sambil berjalan\n"
+        log_text += f"Detector: OpenCV Enhanced (14 variants + 5 thresholds + 4 rotations)\n"
+        log_text += f"Workers: {workers} proses\n"
+        if two_pass:
+            log_text += f"Mode dua tahap: sweep cepat dulu, pencarian mendalam untuk sisanya\n"
+        if log_path:
+            log_text += f"Log lengkap: {log_path}\n"
+        ui.log(log_text + "\n")
+
+    def on_result(record, summary):
+        ui.log(format_record(record) + "\n")
         
-        # Update text secara real-time
-        result_text.delete(1.0, tk.END)
-        result_text.insert(tk.END, log_text)
-        result_text.see(tk.END)
-
-    log_text += f"=== RINGKASAN FINAL ===\n"
-    log_text += f"✅ Berhasil rename: {renamed}\n"
-    log_text += f"❌ QR tidak terbaca: {failed_qr}\n"
-    log_text += f"⚠️  QR terbaca tapi pattern tidak cocok: {failed_pattern}\n"
-    log_text += f"📊 Tingkat keberhasilan: {(renamed/total_files*100):.1f}%\n"
-    
-    result_text.delete(1.0, tk.END)
-    result_text.insert(tk.END, log_text)
+        current_file = summary["processed"]
+        total_files = summary["total"]
+        renamed = summary["renamed"]
+        failed_qr = summary["failed_qr"]
+        failed_pattern = summary["failed_pattern"]
+        stage = f"Tahap {summary['pass']}/2 | " if two_pass else ""
+        more = "+" if summary["discovering"] else ""
+        if progress_bar is not None:
+            ui.set("maximum", progress_bar.config, maximum=max(1, total_files))
+        ui.set("progress", progress_var.set, current_file)
+        ui.set("status", status_label.config,
+               text=f"{stage}{current_file}/{total_files}{more} | ✅{renamed} ❌{failed_qr} ⚠️{failed_pattern}")
+
+    journal_path = os.path.join(input_folder, JOURNAL_FILENAME)
+    undo_path = os.path.join(input_folder, UNDO_FILENAME)
+    index_path = os.path.join(input_folder, ID_INDEX_FILENAME)
+    try:
+        summary = run_batch(input_folder, "stable", workers, on_result=on_result,
+                            on_start=on_start, journal_path=journal_path, resume=resume,
+                            two_pass=two_pass, undo_path=undo_path, index_path=index_path,
+                            memory_limit=default_memory_limit())
+    except Exception:
+        ui.call(ui.close)
+        raise
+
+    total_files = summary["total"]
+    if total_files == 0:
+        ui.call(messagebox.showinfo, "Info", "Tidak ada file gambar yang ditemukan.")
+        ui.call(ui.close)
+        return
+
+    log_text = f"Total file: {total_files}\n"
+    if summary["skipped_done"]:
+        log_text += f"Dilewati (sudah selesai di run sebelumnya): {summary['skipped_done']}\n"
+    if summary["renamed"]:
+        log_text += f"Undo log: {undo_path} (batalkan: python -m ws_planner \"{undo_path}\")\n"
+    if summary["duplicate_ids"]:
+        log_text += (f"Cek ID duplikat: python -m ws_index \"{index_path}\" --duplicates\n")
+    ui.log(log_text + format_summary(summary))
+
+    renamed = summary["renamed"]
+    failed_qr = summary["failed_qr"]
+    failed_pattern = summary["failed_pattern"]
     
-    messagebox.showinfo("Selesai", 
-                       f"🎉 PROSES SELESAI! 🎉\n\n"
-                       f"✅ {renamed} file berhasil di-rename\n"
-                       f"❌ {failed_qr} QR tidak terbaca\n"
-                       f"⚠️ {failed_pattern} pattern tidak cocok\n\n"
-                       f"📊 Success Rate: {(renamed/total_files*100):.1f}%")
+    ui.call(messagebox.showinfo, "Selesai", 
+            f"🎉 PROSES SELESAI! 🎉\n\n"
+            f"✅ {renamed} file berhasil di-rename\n"
+            f"❌ {failed_qr} QR tidak terbaca\n"
+            f"⚠️ {failed_pattern} pattern tidak cocok\n\n"
+            f"📊 Success Rate: {(renamed/total_files*100):.1f}%")
+    ui.call(ui.close)
 
 
-def start_process_stable(entry_input, root):
+def start_process_stable(entry_input, root, workers_var=None, two_pass_var=None):
     input_folder = entry_input.get()
     if not input_folder:
         messagebox.showerror("Error", "Pilih folder input terlebih dahulu!")
         return
 
-    # Hitung total file gambar
-    all_files = []
-    for root_dir, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root_dir, file))
-    total_files = len(all_files)
+    try:
+        workers = max(1, int(workers_var.get())) if workers_var else 1
+    except (tk.TclError, ValueError):
+        messagebox.showerror("Error", "Jumlah worker harus berupa angka!")
+        return
+    two_pass = bool(two_pass_var.get()) if two_pass_var else False
 
-    if total_files == 0:
-        messagebox.showinfo("Info", "Tidak ada file gambar yang ditemukan.")
+    if not os.path.isdir(input_folder):
+        messagebox.showerror("Error", "Input folder tidak ditemukan!")
         return
 
+    # Tawarkan melanjutkan run sebelumnya yang terhenti di tengah jalan
+    resume = False
+    journal_path = os.path.join(input_folder, JOURNAL_FILENAME)
+    if not is_finished(journal_path):
+        resume = messagebox.askyesno(
+            "Lanjutkan?",
+            "Proses sebelumnya di folder ini terhenti sebelum selesai.\n\n"
+            "Lanjutkan dari file terakhir yang selesai?")
+
     # Buat jendela progress
     progress_win = tk.Toplevel(root)
     progress_win.title("Stable Enhanced QR Detection Progress")
@@ -315,8 +174,9 @@ def start_process_stable(entry_input, root):
     progress_frame = tk.Frame(progress_win)
     progress_frame.pack(fill=tk.X, padx=10, pady=5)
     
+    # Maximum diperbarui selama file masih ditemukan
     progress_bar = ttk.Progressbar(progress_frame, variable=progress_var, 
-                                  maximum=total_files, length=500)
+                                  maximum=1, length=500)
     progress_bar.pack(pady=5)
 
     status_label = tk.Label(progress_frame, text="Memulai proses...", 
@@ -343,9 +203,14 @@ def start_process_stable(entry_input, root):
     
     progress_win.update()
 
+    # Worker hanya mengirim event; main loop Tk yang menggambar ulang
+    log = LogSink(result_text, default_log_path(input_folder))
+    ui = UIEventQueue(progress_win, log).start()
+
     # Jalankan proses di thread terpisah untuk tidak freeze UI
     def run_process():
-        process_files_stable(input_folder, progress_var, status_label, progress_win, result_text)
+        process_files_stable(input_folder, progress_var, status_label, ui, workers, resume,
+                             two_pass, progress_bar)
     
     thread = threading.Thread(target=run_process)
     thread.daemon = True
@@ -362,7 +227,7 @@ def browse_folder(entry):
 def main():
     root = tk.Tk()
     root.title("🛡️ Stable QR File Renamer v2.0 - OpenCV Enhanced")
-    root.geometry("600x200")
+    root.geometry("600x270")
     root.configure(bg="lightgreen")
 
     # Header
@@ -390,9 +255,25 @@ def main():
               command=lambda: browse_folder(entry_input),
               bg="green", fg="white", font=("Arial", 10)).pack(pady=2)
 
+    # Jumlah worker (proses paralel)
+    workers_frame = tk.Frame(root, bg="lightgreen")
+    workers_frame.pack(fill=tk.X, padx=20)
+    
+    tk.Label(workers_frame, text="⚙️ Workers (proses paralel):", 
+             font=("Arial", 10, "bold"), bg="lightgreen").pack(side=tk.LEFT)
+    
+    workers_var = tk.IntVar(value=default_workers())
+    tk.Spinbox(workers_frame, from_=1, to=max(64, default_workers()), width=5,
+               textvariable=workers_var, font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+
+    # Mode dua tahap: file yang mudah langsung di-rename
+    two_pass_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="⚡ Dua tahap: rename cepat dulu, pencarian mendalam untuk sisanya",
+                   variable=two_pass_var, font=("Arial", 10), bg="lightgreen").pack(anchor="w", padx=20)
+
     # Process button
     tk.Button(root, text="🚀 MULAI STABLE DETECTION", 
-              command=lambda: start_process_stable(entry_input, root),
+              command=lambda: start_process_stable(entry_input, root, workers_var, two_pass_var),
               bg="darkgreen", fg="white", font=("Arial", 14, "bold"), 
               relief="raised", bd=3).pack(pady=20)
 
@@ -407,4 +288,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -2,11 +2,16 @@ import os
 import cv2
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import re
 import numpy as np
-from qreader import QReader
-from pyzxing import BarCodeReader
 import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from ws_engine import find_image_files, apply_result, format_record, format_summary, new_summary, update_summary
+from ws_planner import RenamePlanner, UNDO_FILENAME
+from ws_ui import LogSink, UIEventQueue, default_log_path
+from ws_zxing import ZXingBackend
+from ws_qreader import QReaderStage
+from ws_race import DetectorRace
 
 
 class MultiQRDetector:
@@ -15,8 +20,14 @@ class MultiQRDetector:
     def __init__(self):
         # Initialize all detectors
         self.opencv_detector = cv2.QRCodeDetector()
-        self.qreader = QReader()
-        self.zxing_reader = BarCodeReader()
+        # Model QReader dimuat dan di-warm-up sekali (CPU)
+        self.qreader_stage = QReaderStage()
+        # zxing-cpp di dalam proses (fallback pyzxing/Java)
+        self.zxing = ZXingBackend()
+        # Scheduler race untuk ketiga detector
+        self.race = DetectorRace(max_workers=3)
+        # Batch inference QReader untuk beberapa file berjalan di thread sendiri
+        self.qreader_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ws_qreader")
         
     def enhance_image_variants(self, img):
         """Buat berbagai varian gambar untuk meningkatkan deteksi"""
@@ -65,10 +76,12 @@ class MultiQRDetector:
         
         return variants
     
-    def try_opencv_detector(self, img_variants, rotations=[0, 90, 180, 270]):
-        """Coba OpenCV QR detector dengan berbagai variasi"""
+    def try_opencv_detector(self, img_variants, rotations=[0, 90, 180, 270], cancel=None):
+        """Coba OpenCV QR detector dengan berbagai variasi (berhenti jika cancel di-set)"""
         for variant_name, img in img_variants:
             for angle in rotations:
+                if cancel is not None and cancel.is_set():
+                    return None, None
                 try:
                     if angle != 0:
                         if len(img.shape) == 3:
@@ -88,185 +101,176 @@ class MultiQRDetector:
                     continue
         return None, None
     
-    def try_qreader_detector(self, img_variants, rotations=[0, 90, 180, 270]):
-        """Coba QReader detector"""
-        for variant_name, img in img_variants:
-            for angle in rotations:
-                try:
-                    if angle != 0:
-                        if len(img.shape) == 3:
-                            h, w = img.shape[:2]
-                        else:
-                            h, w = img.shape
-                        center = (w // 2, h // 2)
-                        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                        rotated = cv2.warpAffine(img, M, (w, h))
-                    else:
-                        rotated = img
-                    
-                    # QReader butuh 3 channel
-                    if len(rotated.shape) == 2:
-                        rotated_rgb = cv2.cvtColor(rotated, cv2.COLOR_GRAY2RGB)
-                    else:
-                        rotated_rgb = cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB)
-                    
-                    results = self.qreader.detect_and_decode(rotated_rgb)
-                    if results and len(results) > 0:
-                        for result in results:
-                            if result and len(result.strip()) > 0:
-                                return f"QReader({variant_name},rot{angle})", result.strip()
-                except:
-                    continue
+    def try_qreader_detector(self, img):
+        """Coba QReader: satu pass model di CPU, decode crop hasil deteksi dengan OpenCV"""
+        if not self.qreader_stage.available:
+            return None, None
+        for result in self.qreader_stage.detect_and_decode(img):
+            return "QReader(crop)", result
         return None, None
     
+    def try_qreader_batch(self, batch, index, cancel):
+        """Hasil QReader untuk gambar ke-index dari batch inference (Future)
+
+        Menunggu batch selesai, tetapi berhenti begitu detector lain menang.
+        """
+        while True:
+            try:
+                codes = batch.result(timeout=0.05)
+                break
+            except FutureTimeout:
+                if cancel.is_set():
+                    return None, None
+        for result in codes[index]:
+            return "QReader(batch)", result
+        return None, None
+
     def try_zxing_detector(self, original_img):
-        """Coba ZXing detector (hanya dengan gambar asli karena butuh file)"""
-        try:
-            # Simpan temporary file
-            temp_path = "temp_qr.jpg"
-            cv2.imwrite(temp_path, original_img)
-            
-            # Decode dengan ZXing
-            results = self.zxing_reader.decode(temp_path)
-            
-            # Hapus file temporary
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            
-            if results and len(results) > 0:
-                for result in results:
-                    if 'parsed' in result and result['parsed']:
-                        return "ZXing", result['parsed'].strip()
-        except Exception as e:
-            # Cleanup jika error
-            if os.path.exists("temp_qr.jpg"):
-                os.remove("temp_qr.jpg")
+        """Coba ZXing detector langsung dari array gambar (tanpa file sementara)"""
+        if not self.zxing.available:
+            return None, None
+        for result in self.zxing.decode(original_img):
+            return f"ZXing({self.zxing.backend})", result
         return None, None
     
     def detect_qr_code(self, image_path):
-        """Deteksi QR code menggunakan semua detector secara berurutan"""
+        """Deteksi QR code: semua detector berjalan bersamaan, ID 14 digit pertama menang"""
         try:
             img = cv2.imread(image_path)
             if img is None:
                 return None, "❌ Tidak bisa membaca gambar"
-            
-            # Buat berbagai varian gambar
-            img_variants = self.enhance_image_variants(img)
-            
-            # Coba berbagai detector secara berurutan
-            detectors = [
-                ("OpenCV", lambda: self.try_opencv_detector(img_variants)),
-                ("QReader", lambda: self.try_qreader_detector(img_variants)),
-                ("ZXing", lambda: self.try_zxing_detector(img))
-            ]
-            
-            for detector_name, detector_func in detectors:
-                try:
-                    method, result = detector_func()
-                    if result:
-                        return result, f"✅ Berhasil dengan {method}"
-                except Exception as e:
-                    continue
-            
-            return None, "❌ Semua detector gagal"
-            
+            return self.detect_qr_image(img)
         except Exception as e:
             return None, f"❌ Error: {str(e)}"
 
+    def detect_qr_codes(self, image_paths):
+        """Generator (path, qr_text, detection_info) untuk banyak file
+
+        File dibaca per kelompok batch_size QReader: model QReader menjalankan
+        satu batch inference untuk seluruh kelompok di thread sendiri,
+        sementara race per gambar tetap berjalan seperti detect_qr_code.
+        """
+        batch_size = self.qreader_stage.batch_size
+        for start in range(0, len(image_paths), batch_size):
+            chunk = image_paths[start:start + batch_size]
+            images = [cv2.imread(path) for path in chunk]
+            readable = [img for img in images if img is not None]
+            batch = None
+            if self.qreader_stage.available and readable:
+                batch = self.qreader_pool.submit(self.qreader_stage.detect_and_decode_batch,
+                                                 readable)
+            index = 0
+            for path, img in zip(chunk, images):
+                if img is None:
+                    yield path, None, "❌ Tidak bisa membaca gambar"
+                    continue
+                try:
+                    qr_text, detection_info = self.detect_qr_image(img, batch, index)
+                except Exception as e:
+                    qr_text, detection_info = None, f"❌ Error: {str(e)}"
+                index += 1
+                yield path, qr_text, detection_info
+
+    def detect_qr_image(self, img, batch=None, index=0):
+        """Race OpenCV, QReader dan ZXing pada gambar yang sudah dibaca
 
-def process_files_ultra(input_folder, progress_var, status_label, progress_win, result_text):
-    """Proses files dengan ultra-enhanced detection"""
+        batch (Future dari detect_qr_codes) berisi hasil QReader untuk
+        beberapa gambar sekaligus; tanpa batch QReader dijalankan per gambar.
+        """
+        # Buat berbagai varian gambar
+        img_variants = self.enhance_image_variants(img)
+
+        if batch is not None:
+            qreader_task = lambda cancel: self.try_qreader_batch(batch, index, cancel)
+        else:
+            qreader_task = lambda cancel: self.try_qreader_detector(img)
+
+        # Race: OpenCV, QReader dan ZXing di thread berbeda
+        method, result = self.race.run([
+            ("OpenCV", lambda cancel: self.try_opencv_detector(img_variants, cancel=cancel)),
+            ("QReader", qreader_task),
+            ("ZXing", lambda cancel: self.try_zxing_detector(img)),
+        ])
+        if result:
+            return result, f"✅ Berhasil dengan {method}"
+
+        return None, "❌ Semua detector gagal"
+
+
+def process_files_ultra(input_folder, progress_var, status_label, ui):
+    """Proses files dengan ultra-enhanced detection
+
+    Berjalan di thread worker: update widget dikirim lewat ui (UIEventQueue).
+    """
     if not os.path.exists(input_folder):
-        messagebox.showerror("Error", "Input folder tidak ditemukan!")
+        ui.call(messagebox.showerror, "Error", "Input folder tidak ditemukan!")
+        ui.call(ui.close)
         return
 
     # Initialize detector
     detector = MultiQRDetector()
     
     # Hitung total file gambar
-    all_files = []
-    for root, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root, file))
+    all_files = find_image_files(input_folder)
 
     total_files = len(all_files)
     if total_files == 0:
-        messagebox.showinfo("Info", "Tidak ada file gambar yang ditemukan.")
+        ui.call(messagebox.showinfo, "Info", "Tidak ada file gambar yang ditemukan.")
+        ui.call(ui.close)
         return
 
-    progress_var.set(0)
-    current_file = 0
-    renamed = 0
-    failed_qr = 0
-    failed_pattern = 0
+    ui.set("progress", progress_var.set, 0)
+    summary = new_summary(total_files)
+    
+    log_path = ui.log_sink.log_path if ui.log_sink else None
     
     log_text = f"=== LAPORAN ULTRA-ENHANCED QR DETECTION ===\n"
     log_text += f"Folder: {input_folder}\n"
     log_text += f"Total file: {total_files}\n"
-    log_text += f"Detector: OpenCV + QReader + ZXing\n\n"
+    log_text += f"Detector: OpenCV + QReader + ZXing\n"
+    if detector.qreader_stage.batch_error:
+        log_text += (f"QReader batch tidak tersedia ({detector.qreader_stage.batch_error}), "
+                     f"deteksi per gambar\n")
+    if log_path:
+        log_text += f"Log lengkap: {log_path}\n"
+    ui.log(log_text + "\n")
     
-    for file_path in all_files:
-        filename = os.path.basename(file_path)
-        log_text += f"📷 {filename}: "
-        
-        qr_text, detection_info = detector.detect_qr_code(file_path)
-        
-        if qr_text:
-            log_text += f"{detection_info}\n"
-            log_text += f"   📄 QR Content: '{qr_text}'\n"
+    # Semua rename dicatat ke undo log agar bisa dibatalkan
+    undo_path = os.path.join(input_folder, UNDO_FILENAME)
+    planner = RenamePlanner(undo_path)
+    try:
+        # QReader: satu batch inference per kelompok file, bukan per gambar
+        for file_path, qr_text, detection_info in detector.detect_qr_codes(all_files):
+            record = apply_result(file_path, qr_text, detection_info, planner=planner)
+            update_summary(summary, record)
+            ui.log(format_record(record) + "\n")
             
-            # Cari 14 digit pattern
-            match = re.search(r"(\d{14})", qr_text)
-            if match:
-                angka14 = match.group(1)
-                ext = os.path.splitext(file_path)[1].lower()
-                new_name = angka14 + "_2025" + ext
-                new_path = os.path.join(os.path.dirname(file_path), new_name)
-                
-                try:
-                    if not os.path.exists(new_path):
-                        os.rename(file_path, new_path)
-                        renamed += 1
-                        log_text += f"   ✅ RENAMED ke: {new_name}\n"
-                    else:
-                        log_text += f"   ⚠️  Skip (file {new_name} sudah ada)\n"
-                except Exception as e:
-                    log_text += f"   ❌ Gagal rename: {e}\n"
-            else:
-                failed_pattern += 1
-                log_text += f"   ⚠️  Pattern 14 digit tidak ditemukan\n"
-        else:
-            failed_qr += 1
-            log_text += f"{detection_info}\n"
-        
-        log_text += "\n"
-        
-        current_file += 1
-        progress_var.set(current_file)
-        status_label.config(text=f"{current_file}/{total_files} | ✅{renamed} ❌{failed_qr} ⚠️{failed_pattern}")
-        progress_win.update_idletasks()
-        
-        # Update text secara real-time
-        result_text.delete(1.0, tk.END)
-        result_text.insert(tk.END, log_text)
-        result_text.see(tk.END)
-
-    log_text += f"=== RINGKASAN FINAL ===\n"
-    log_text += f"✅ Berhasil rename: {renamed}\n"
-    log_text += f"❌ QR tidak terbaca: {failed_qr}\n"
-    log_text += f"⚠️  QR terbaca tapi pattern tidak cocok: {failed_pattern}\n"
-    log_text += f"📊 Tingkat keberhasilan: {(renamed/total_files*100):.1f}%\n"
-    
-    result_text.delete(1.0, tk.END)
-    result_text.insert(tk.END, log_text)
-    
-    messagebox.showinfo("Selesai", 
-                       f"🎉 PROSES SELESAI! 🎉\n\n"
-                       f"✅ {renamed} file berhasil di-rename\n"
-                       f"❌ {failed_qr} QR tidak terbaca\n"
-                       f"⚠️ {failed_pattern} pattern tidak cocok\n\n"
-                       f"📊 Success Rate: {(renamed/total_files*100):.1f}%")
+            current_file = summary["processed"]
+            renamed = summary["renamed"]
+            failed_qr = summary["failed_qr"]
+            failed_pattern = summary["failed_pattern"]
+            ui.set("progress", progress_var.set, current_file)
+            ui.set("status", status_label.config,
+                   text=f"{current_file}/{total_files} | ✅{renamed} ❌{failed_qr} ⚠️{failed_pattern}")
+    except Exception:
+        ui.call(ui.close)
+        raise
+    finally:
+        planner.close()
+
+    renamed = summary["renamed"]
+    failed_qr = summary["failed_qr"]
+    failed_pattern = summary["failed_pattern"]
+    if renamed:
+        ui.log(f"Undo log: {undo_path} (batalkan: python -m ws_planner \"{undo_path}\")\n")
+    ui.log(format_summary(summary))
+    ui.call(messagebox.showinfo, "Selesai", 
+            f"🎉 PROSES SELESAI! 🎉\n\n"
+            f"✅ {renamed} file berhasil di-rename\n"
+            f"❌ {failed_qr} QR tidak terbaca\n"
+            f"⚠️ {failed_pattern} pattern tidak cocok\n\n"
+            f"📊 Success Rate: {(renamed/total_files*100):.1f}%")
+    ui.call(ui.close)
 
 
 def start_process_ultra(entry_input, root):
@@ -276,12 +280,7 @@ def start_process_ultra(entry_input, root):
         return
 
     # Hitung total file gambar
-    all_files = []
-    for root_dir, dirs, files in os.walk(input_folder):
-        for file in files:
-            if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                all_files.append(os.path.join(root_dir, file))
-    total_files = len(all_files)
+    total_files = len(find_image_files(input_folder))
 
     if total_files == 0:
         messagebox.showinfo("Info", "Tidak ada file gambar yang ditemukan.")
@@ -335,9 +334,13 @@ def start_process_ultra(entry_input, root):
     
     progress_win.update()
 
+    # Worker hanya mengirim event; main loop Tk yang menggambar ulang
+    log = LogSink(result_text, default_log_path(input_folder))
+    ui = UIEventQueue(progress_win, log).start()
+
     # Jalankan proses di thread terpisah untuk tidak freeze UI
     def run_process():
-        process_files_ultra(input_folder, progress_var, status_label, progress_win, result_text)
+        process_files_ultra(input_folder, progress_var, status_label, ui)
     
     thread = threading.Thread(target=run_process)
     thread.daemon = True
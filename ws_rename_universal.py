@@ -17,7 +17,6 @@ import sys
 import subprocess
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
-import re
 import threading
 from datetime import datetime
 
@@ -53,6 +52,11 @@ if np is None:
 
 print("✅ All dependencies ready!")
 
+from ws_detector import StableQRDetector, PROFILES
+from ws_engine import find_image_files, extract_id, rename_to_id, STATUS_RENAMED, STATUS_EXISTS
+from ws_planner import RenamePlanner, UNDO_FILENAME
+from ws_ui import LogSink, UIEventQueue
+
 
 class UniversalQRRenamer:
     def __init__(self):
@@ -61,8 +65,10 @@ class UniversalQRRenamer:
         self.root.geometry("700x550")
         self.root.configure(bg="white")
         
-        self.detector = cv2.QRCodeDetector()
+        self.detector = StableQRDetector("universal")
         self.setup_ui()
+        # Thread proses hanya mengirim event; widget diupdate oleh main loop
+        self.ui = UIEventQueue(self.root, LogSink(self.log_text)).start()
         
     def setup_ui(self):
         # Header
@@ -137,94 +143,26 @@ class UniversalQRRenamer:
             self.log(f"📁 Folder dipilih: {folder}")
             
             # Hitung file
-            count = 0
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                        count += 1
+            count = len(find_image_files(folder))
             
             self.log(f"📊 Ditemukan {count} file gambar")
             self.status_label.config(text=f"Siap memproses {count} file gambar dengan enhanced detection")
     
     def log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-    
-    def enhance_image_variants(self, img):
-        """Create multiple image variants for better detection"""
-        variants = [img]  # Original
-        
-        # Grayscale
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            variants.append(gray)
-            
-            # Enhanced contrast
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(gray)
-            variants.append(enhanced)
-            
-            # Threshold variants
-            _, thresh1 = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-            variants.append(thresh1)
-            
-            _, thresh2 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            variants.append(thresh2)
-        
-        return variants
+        self.ui.log(f"[{timestamp}] {message}\n")
     
     def detect_qr_enhanced(self, image_path):
         """Enhanced QR detection with multiple variants and rotations"""
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                return None
-            
-            # Create image variants
-            variants = self.enhance_image_variants(img)
-            
-            # Try detection with different variants and rotations
-            for variant in variants:
-                for angle in [0, 90, 180, 270]:
-                    try:
-                        if angle != 0:
-                            if len(variant.shape) == 3:
-                                h, w = variant.shape[:2]
-                            else:
-                                h, w = variant.shape
-                            center = (w // 2, h // 2)
-                            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                            rotated = cv2.warpAffine(variant, M, (w, h))
-                        else:
-                            rotated = variant
-                        
-                        data, bbox, _ = self.detector.detectAndDecode(rotated)
-                        if data and len(data.strip()) > 0:
-                            return data.strip()
-                    except:
-                        continue
-            
-            return None
-        except:
-            return None
+        qr_text, _ = self.detector.detect_qr_code(image_path)
+        return qr_text
     
-    def process_files(self):
-        folder = self.folder_var.get()
-        if not folder:
-            messagebox.showerror("Error", "Pilih folder terlebih dahulu!")
-            return
-        
+    def process_files(self, folder):
         self.log("🚀 Memulai enhanced QR detection...")
-        self.log(f"🔧 Using OpenCV {cv2.__version__} with {len(self.enhance_image_variants(np.zeros((100,100,3), dtype=np.uint8)))} variants × 4 rotations")
+        self.log(f"🔧 Using OpenCV {cv2.__version__} with {len(PROFILES['universal']['variants'])} variants × 4 rotations")
         
         # Collect all image files
-        all_files = []
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                    all_files.append(os.path.join(root, file))
+        all_files = find_image_files(folder)
         
         total = len(all_files)
         renamed = 0
@@ -233,38 +171,41 @@ class UniversalQRRenamer:
         
         self.log(f"📊 Processing {total} files...")
         
-        for i, file_path in enumerate(all_files, 1):
-            filename = os.path.basename(file_path)
-            self.status_label.config(text=f"Processing {i}/{total}: {filename}")
-            
-            # Detect QR
-            qr_text = self.detect_qr_enhanced(file_path)
-            
-            if qr_text:
-                # Find 14 digit pattern
-                match = re.search(r"(\d{14})", qr_text)
-                if match:
-                    angka14 = match.group(1)
-                    ext = os.path.splitext(file_path)[1].lower()
-                    new_name = angka14 + "_2025" + ext
-                    new_path = os.path.join(os.path.dirname(file_path), new_name)
-                    
-                    try:
-                        if not os.path.exists(new_path):
-                            os.rename(file_path, new_path)
+        # Semua rename dicatat ke undo log agar bisa dibatalkan
+        undo_path = os.path.join(folder, UNDO_FILENAME)
+        planner = RenamePlanner(undo_path)
+        try:
+            for i, file_path in enumerate(all_files, 1):
+                filename = os.path.basename(file_path)
+                self.ui.set("status", self.status_label.config, text=f"Processing {i}/{total}: {filename}")
+
+                # Detect QR
+                qr_text = self.detect_qr_enhanced(file_path)
+
+                if qr_text:
+                    # Find 14 digit pattern
+                    angka14 = extract_id(qr_text)
+                    if angka14:
+                        status, new_name, error = rename_to_id(file_path, angka14, planner)
+                        if status == STATUS_RENAMED:
                             renamed += 1
                             self.log(f"✅ {filename} → {new_name}")
-                        else:
+                        elif status == STATUS_EXISTS:
                             self.log(f"⚠️  {filename} → Skip (sudah ada)")
-                    except Exception as e:
-                        failed_qr += 1
-                        self.log(f"❌ {filename} → Rename error: {e}")
+                        else:
+                            failed_qr += 1
+                            self.log(f"❌ {filename} → Rename error: {error}")
+                    else:
+                        failed_pattern += 1
+                        self.log(f"⚠️  {filename} → QR: '{qr_text[:30]}...' (bukan 14 digit)")
                 else:
-                    failed_pattern += 1
-                    self.log(f"⚠️  {filename} → QR: '{qr_text[:30]}...' (bukan 14 digit)")
-            else:
-                failed_qr += 1
-                self.log(f"❌ {filename} → QR tidak terbaca")
+                    failed_qr += 1
+                    self.log(f"❌ {filename} → QR tidak terbaca")
+        finally:
+            planner.close()
+
+        if renamed:
+            self.log(f"↩️  Undo log: {undo_path} (batalkan: python -m ws_planner \"{undo_path}\")")
         
         # Summary
         success_rate = (renamed/total*100) if total > 0 else 0
@@ -274,23 +215,25 @@ class UniversalQRRenamer:
         self.log(f"⚠️  Pattern tidak cocok: {failed_pattern}")
         self.log(f"📊 Success rate: {success_rate:.1f}%")
         
-        self.status_label.config(text=f"Selesai! {renamed} berhasil, {failed_qr+failed_pattern} gagal ({success_rate:.1f}%)")
+        self.ui.set("status", self.status_label.config,
+                    text=f"Selesai! {renamed} berhasil, {failed_qr+failed_pattern} gagal ({success_rate:.1f}%)")
         
-        messagebox.showinfo("Proses Selesai", 
-                           f"🎉 Universal QR Processing Complete! 🎉\n\n"
-                           f"✅ Berhasil: {renamed}\n"
-                           f"❌ QR tidak terbaca: {failed_qr}\n"
-                           f"⚠️ Pattern tidak cocok: {failed_pattern}\n\n"
-                           f"📊 Success rate: {success_rate:.1f}%\n\n"
-                           f"© mrdj 2025 for Team Wilkerstat 3206")
+        self.ui.call(messagebox.showinfo, "Proses Selesai", 
+                     f"🎉 Universal QR Processing Complete! 🎉\n\n"
+                     f"✅ Berhasil: {renamed}\n"
+                     f"❌ QR tidak terbaca: {failed_qr}\n"
+                     f"⚠️ Pattern tidak cocok: {failed_pattern}\n\n"
+                     f"📊 Success rate: {success_rate:.1f}%\n\n"
+                     f"© mrdj 2025 for Team Wilkerstat 3206")
     
     def start_process(self):
-        if not self.folder_var.get():
+        folder = self.folder_var.get()
+        if not folder:
             messagebox.showerror("Error", "Pilih folder terlebih dahulu!")
             return
         
         # Run in thread to prevent UI freeze
-        thread = threading.Thread(target=self.process_files)
+        thread = threading.Thread(target=self.process_files, args=(folder,))
         thread.daemon = True
         thread.start()
     
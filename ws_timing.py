@@ -0,0 +1,195 @@
+"""
+QR Stage Timing
+Instrumentasi waktu per tahap deteksi (opt-in) untuk tuning profile
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+StageTimer mencatat wall time dan jumlah panggilan per tahap (imread,
+locate, variant, rotate, threshold, decode) dan per variant untuk satu
+gambar. TimingReport menggabungkan hasil semua file: total per tahap,
+histogram, CSV per file dan daftar file paling lambat.
+"""
+
+import csv
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Tahap yang dicatat, sesuai urutan kolom CSV
+STAGES = ["read", "imread", "locate", "variant", "rotate", "threshold", "decode"]
+
+# Batas atas bucket histogram (ms); bucket terakhir = lebih dari itu
+HIST_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+DEFAULT_TOP_N = 10
+
+
+class StageTimer:
+    """Pencatat waktu per tahap untuk satu gambar (reset setiap gambar baru)"""
+
+    enabled = True
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.variants = {}
+
+    def add(self, stage, seconds, variant=None):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        if variant is not None:
+            entry = self.variants.setdefault(f"{stage}:{variant}", [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    @contextmanager
+    def measure(self, stage, variant=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, variant)
+
+    def to_dict(self):
+        """Hasil gambar ini: {"stages": {stage: {"ms", "calls"}}, "variants": {...}}"""
+        return {
+            "stages": {k: {"ms": s * 1000, "calls": c} for k, (s, c) in self.stages.items()},
+            "variants": {k: {"ms": s * 1000, "calls": c} for k, (s, c) in self.variants.items()},
+        }
+
+
+class NullTimer:
+    """Timer kosong (default): instrumentasi mati tanpa biaya berarti"""
+
+    enabled = False
+    _context = nullcontext()
+
+    def reset(self):
+        pass
+
+    def add(self, stage, seconds, variant=None):
+        pass
+
+    def measure(self, stage, variant=None):
+        return self._context
+
+    def to_dict(self):
+        return None
+
+
+NULL_TIMER = NullTimer()
+
+
+def add_stage(timing, stage, seconds):
+    """Tambahkan satu tahap yang diukur di luar detector ke dict timing"""
+    entry = timing["stages"].setdefault(stage, {"ms": 0.0, "calls": 0})
+    entry["ms"] += seconds * 1000
+    entry["calls"] += 1
+    return timing
+
+
+def bucket_label(index):
+    if index < len(HIST_BUCKETS_MS):
+        return f"<={HIST_BUCKETS_MS[index]}ms"
+    return f">{HIST_BUCKETS_MS[-1]}ms"
+
+
+def bucket_index(ms):
+    for i, bound in enumerate(HIST_BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(HIST_BUCKETS_MS)
+
+
+class TimingReport:
+    """Agregasi timing semua file dalam satu run"""
+
+    def __init__(self):
+        self.rows = []
+        self.stage_totals = {}
+        self.variant_totals = {}
+        # Histogram waktu per file: total dan per tahap
+        self.histograms = {"total": [0] * (len(HIST_BUCKETS_MS) + 1)}
+
+    def add(self, file_path, timing, elapsed, found=None):
+        """Catat satu file; timing = StageTimer.to_dict(), elapsed dalam detik"""
+        timing = timing or {"stages": {}, "variants": {}}
+        total_ms = elapsed * 1000
+        self.histograms["total"][bucket_index(total_ms)] += 1
+
+        for stage, entry in timing["stages"].items():
+            totals = self.stage_totals.setdefault(stage, {"ms": 0.0, "calls": 0})
+            totals["ms"] += entry["ms"]
+            totals["calls"] += entry["calls"]
+            hist = self.histograms.setdefault(stage, [0] * (len(HIST_BUCKETS_MS) + 1))
+            hist[bucket_index(entry["ms"])] += 1
+        for key, entry in timing["variants"].items():
+            totals = self.variant_totals.setdefault(key, {"ms": 0.0, "calls": 0})
+            totals["ms"] += entry["ms"]
+            totals["calls"] += entry["calls"]
+
+        self.rows.append({"file": file_path, "total_ms": total_ms, "found": found,
+                          "stages": timing["stages"]})
+
+    def slowest(self, n=DEFAULT_TOP_N):
+        return sorted(self.rows, key=lambda row: row["total_ms"], reverse=True)[:n]
+
+    def write_csv(self, path):
+        """CSV satu baris per file: total_ms lalu ms dan calls per tahap"""
+        columns = ["file", "total_ms", "found"]
+        for stage in STAGES:
+            columns += [f"{stage}_ms", f"{stage}_calls"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in self.rows:
+                values = [row["file"], f"{row['total_ms']:.2f}",
+                          "" if row["found"] is None else int(row["found"])]
+                for stage in STAGES:
+                    entry = row["stages"].get(stage, {"ms": 0.0, "calls": 0})
+                    values += [f"{entry['ms']:.2f}", entry["calls"]]
+                writer.writerow(values)
+
+    def to_dict(self, top_n=DEFAULT_TOP_N):
+        return {
+            "files": len(self.rows),
+            "stages": self.stage_totals,
+            "variants": self.variant_totals,
+            "histograms": {name: {bucket_label(i): count for i, count in enumerate(hist)}
+                           for name, hist in self.histograms.items()},
+            "slowest": [{"file": row["file"], "total_ms": round(row["total_ms"], 2)}
+                        for row in self.slowest(top_n)],
+        }
+
+    def format_report(self, top_n=DEFAULT_TOP_N):
+        """Ringkasan teks: total per tahap, variant termahal, histogram, file terlambat"""
+        lines = ["", "=== TIMING PER TAHAP ==="]
+        grand = sum(entry["ms"] for entry in self.stage_totals.values()) or 1.0
+        for stage in STAGES:
+            entry = self.stage_totals.get(stage)
+            if entry:
+                lines.append(f"{stage:<10} {entry['ms']:>10.1f} ms  {entry['calls']:>8} calls  "
+                             f"{entry['ms'] / grand * 100:>5.1f}%")
+
+        if self.variant_totals:
+            lines.append("")
+            lines.append("Variant termahal (tahap:variant):")
+            ranked = sorted(self.variant_totals.items(), key=lambda kv: kv[1]["ms"], reverse=True)
+            for key, entry in ranked[:top_n]:
+                lines.append(f"  {key:<30} {entry['ms']:>10.1f} ms  {entry['calls']:>8} calls")
+
+        lines.append("")
+        lines.append("Histogram waktu per file:")
+        for i, count in enumerate(self.histograms["total"]):
+            if count:
+                lines.append(f"  {bucket_label(i):>10} {count:>6}")
+
+        lines.append("")
+        lines.append(f"{top_n} file paling lambat:")
+        for row in self.slowest(top_n):
+            lines.append(f"  {row['total_ms']:>10.1f} ms  {row['file']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+"""
+QR Renamer UI Helpers
+Komponen bersama untuk front end Tkinter
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+"""
+
+import os
+import queue
+from datetime import datetime
+
+
+LOG_FILENAME_FORMAT = "qr_rename_log_%Y%m%d_%H%M%S.txt"
+DEFAULT_MAX_LINES = 2000
+DEFAULT_DRAIN_MS = 100
+
+
+def default_log_path(folder):
+    """Path file log lengkap untuk run yang dimulai sekarang"""
+    return os.path.join(folder, datetime.now().strftime(LOG_FILENAME_FORMAT))
+
+
+class LogSink:
+    """Log incremental: hanya baris baru yang ditambahkan ke widget Text
+
+    Widget hanya menyimpan max_lines baris terakhir (ring buffer); log
+    lengkap ditulis streaming ke file di disk jika log_path diberikan.
+    """
+
+    def __init__(self, text_widget, log_path=None, max_lines=DEFAULT_MAX_LINES):
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.log_path = log_path
+        self._file = None
+        if log_path:
+            try:
+                self._file = open(log_path, "a", encoding="utf-8", buffering=1)
+            except OSError:
+                self._file = None
+                self.log_path = None
+
+    def write(self, text):
+        """Tambahkan teks ke log (widget dan file)"""
+        self.write_file(text)
+        self.write_widget(text)
+
+    def write_file(self, text):
+        """Tulis ke file log saja (aman dipanggil dari thread worker)"""
+        if text and self._file is not None:
+            self._file.write(text)
+
+    def write_widget(self, text):
+        """Tambahkan teks ke widget saja (hanya dari thread Tk)"""
+        if not text:
+            return
+        widget = self.text_widget
+        widget.insert("end", text)
+
+        # Buang baris lama di widget agar jumlah baris tetap dibatasi
+        line_count = int(widget.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.see("end")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class UIEventQueue:
+    """Antrian event dari thread worker ke main loop Tk
+
+    Worker tidak pernah menyentuh widget: log(), set() dan call() hanya
+    memasukkan event ke queue tanpa blocking. Main loop mengosongkan queue
+    setiap interval_ms lewat after(), menggabungkan semua baris log menjadi
+    satu insert dan hanya menjalankan nilai terakhir untuk setiap key set(),
+    sehingga banyak update menjadi satu repaint.
+    """
+
+    def __init__(self, root, log_sink=None, interval_ms=DEFAULT_DRAIN_MS):
+        self.root = root
+        self.log_sink = log_sink
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()
+        self._running = False
+
+    def start(self):
+        """Mulai drain berkala (panggil dari thread Tk)"""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._drain)
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        """Hentikan drain dan tutup file log (panggil dari thread Tk)"""
+        self.stop()
+        if self.log_sink is not None:
+            self.log_sink.close()
+
+    def log(self, text):
+        """Tambahkan teks log; file ditulis langsung, widget saat drain"""
+        if self.log_sink is not None:
+            self.log_sink.write_file(text)
+        self._queue.put(("log", text, None, None))
+
+    def set(self, key, fn, *args, **kwargs):
+        """Update yang bisa digabung: hanya yang terakhir per key dijalankan"""
+        self._queue.put(("set", key, fn, (args, kwargs)))
+
+    def call(self, fn, *args, **kwargs):
+        """Jalankan fn di thread Tk (berurutan dengan log)"""
+        self._queue.put(("call", None, fn, (args, kwargs)))
+
+    def _drain(self):
+        pending_log = []
+        latest = {}
+        try:
+            while True:
+                kind, key, fn, params = self._queue.get_nowait()
+                if kind == "log":
+                    pending_log.append(key)
+                elif kind == "set":
+                    latest[key] = (fn, params)
+                else:
+                    self._flush_log(pending_log)
+                    pending_log = []
+                    args, kwargs = params
+                    fn(*args, **kwargs)
+        except queue.Empty:
+            pass
+
+        self._flush_log(pending_log)
+        for fn, (args, kwargs) in latest.values():
+            fn(*args, **kwargs)
+
+        if self._running:
+            try:
+                self.root.after(self.interval_ms, self._drain)
+            except Exception:
+                # Jendela sudah ditutup
+                self._running = False
+
+    def _flush_log(self, chunks):
+        if chunks and self.log_sink is not None:
+            self.log_sink.write_widget("".join(chunks))
@@ -0,0 +1,377 @@
+"""
+QR Watch Folder
+Mode daemon: pantau folder upload dan rename foto baru secara otomatis
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Di Linux perubahan folder diterima lewat inotify (tanpa rescan tree); di
+sistem lain atau dengan --polling, hanya folder yang mtime-nya berubah
+yang dibaca ulang. File baru baru diproses setelah ukurannya stabil
+(upload selesai), lalu masuk ke pipeline deteksi + rename yang sama dengan
+batch, memakai satu detector yang tetap hangat.
+
+Penggunaan:
+    python -m ws_watch /data/upload --profile stable --stable-seconds 2
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import argparse
+import threading
+import ctypes
+import ctypes.util
+from datetime import datetime
+
+from ws_detector import StableQRDetector, PROFILES, DEFAULT_PROFILE
+from ws_engine import (IMAGE_EXTENSIONS, is_renamed_name, iter_image_files, apply_result,
+                       format_record, format_summary, new_summary, update_summary)
+from ws_planner import RenamePlanner, UNDO_FILENAME
+
+
+DEFAULT_STABLE_SECONDS = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+# mtime folder di SMB/FAT beresolusi 2 detik: folder yang mtime-nya sedekat
+# ini dengan listing terakhir bisa saja berubah lagi tanpa mtime baru
+MTIME_SLACK_SECONDS = 3.0
+
+# Konstanta inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_candidate(name):
+    """File gambar yang belum berformat [14digit]_2025.ext"""
+    return name.lower().endswith(IMAGE_EXTENSIONS) and not is_renamed_name(name)
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """Watcher rekursif berbasis inotify (Linux)
+
+    poll(timeout) mengembalikan path file gambar yang dibuat, selesai
+    ditulis atau dipindah ke dalam folder sejak panggilan sebelumnya.
+    """
+
+    name = "inotify"
+
+    def __init__(self, folders, libc=None):
+        self.libc = libc or _load_libc()
+        if self.libc is None:
+            raise OSError("inotify tidak tersedia")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 gagal")
+        self.folders = list(folders)
+        self.watches = {}
+        for folder in self.folders:
+            self._watch_tree(folder)
+
+    def _add_watch(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = folder
+        return wd
+
+    def _watch_tree(self, folder, found=None):
+        """Pasang watch di folder dan semua subfolder; file yang sudah ada masuk found"""
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            self._add_watch(current)
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif found is not None and is_candidate(entry.name):
+                            found.append(entry.path)
+            except OSError:
+                continue
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        found = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Event hilang: baca ulang semua folder sekali
+                for folder in self.folders:
+                    found.extend(iter_image_files(folder, skip_renamed=True))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            folder = self.watches.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # Folder baru: pasang watch, file yang sudah terlanjur ada ikut diproses
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path, found)
+                continue
+            if is_candidate(os.path.basename(path)):
+                found.append(path)
+        return found
+
+    def close(self):
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PollingWatcher:
+    """Fallback tanpa inotify: hanya folder yang mtime-nya berubah yang dibaca
+
+    Setiap poll hanya os.stat per folder; daftar subfolder disimpan dari
+    listing terakhir, jadi folder yang tidak berubah tidak di-scandir ulang.
+    Folder yang mtime-nya masih dalam MTIME_SLACK_SECONDS dari listing
+    terakhir tetap dibaca ulang (filesystem dengan mtime kasar).
+    """
+
+    name = "polling"
+
+    def __init__(self, folders, interval=DEFAULT_POLL_INTERVAL):
+        self.folders = list(folders)
+        self.interval = interval
+        self.dir_mtimes = {}
+        self.listed_at = {}
+        self.subdirs = {}
+        self.known = set()
+        # Baseline: file yang sudah ada tidak dilaporkan sebagai file baru
+        self._scan(report=False)
+
+    def _scan(self, report=True):
+        found = []
+        stack = list(self.folders)
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                self.dir_mtimes.pop(folder, None)
+                self.listed_at.pop(folder, None)
+                self.subdirs.pop(folder, None)
+                continue
+            if (self.dir_mtimes.get(folder) == mtime
+                    and mtime / 1e9 < self.listed_at[folder] - MTIME_SLACK_SECONDS):
+                # Isi folder tidak berubah: cukup turun ke subfolder yang sudah diketahui
+                stack.extend(self.subdirs.get(folder, ()))
+                continue
+            self.dir_mtimes[folder] = mtime
+            self.listed_at[folder] = time.time()
+            subdirs = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif is_candidate(entry.name) and entry.path not in self.known:
+                            self.known.add(entry.path)
+                            if report:
+                                found.append(entry.path)
+            except OSError:
+                pass
+            for gone in set(self.subdirs.get(folder, ())).difference(subdirs):
+                self._forget(gone)
+            self.subdirs[folder] = subdirs
+            stack.extend(subdirs)
+        return found
+
+    def _forget(self, folder):
+        """Hapus state folder yang sudah tidak ada beserta subfoldernya"""
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            self.dir_mtimes.pop(current, None)
+            self.listed_at.pop(current, None)
+            stack.extend(self.subdirs.pop(current, ()))
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return self._scan()
+
+    def close(self):
+        pass
+
+
+def make_watcher(folders, polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """InotifyWatcher jika tersedia, selain itu PollingWatcher"""
+    if not polling:
+        try:
+            return InotifyWatcher(folders)
+        except OSError:
+            pass
+    return PollingWatcher(folders, poll_interval)
+
+
+class WatchDaemon:
+    """Loop daemon: file baru → tunggu ukuran stabil → deteksi → rename
+
+    on_result(record, summary) dipanggil untuk setiap file yang selesai.
+    Dengan undo_path setiap rename ditambahkan ke undo log (ws_planner);
+    satu blok "begin" per kelompok file yang siap bersamaan.
+    """
+
+    def __init__(self, folders, profile=DEFAULT_PROFILE, watcher=None,
+                 stable_seconds=DEFAULT_STABLE_SECONDS, on_result=None, detector_options=None,
+                 undo_path=None):
+        self.folders = list(folders)
+        self.undo_path = undo_path
+        self.watcher = watcher or make_watcher(self.folders)
+        self.stable_seconds = stable_seconds
+        self.on_result = on_result
+        # Detector dibuat sekali dan tetap hangat selama daemon berjalan
+        self.detector = StableQRDetector(profile, **(detector_options or {}))
+        self.summary = new_summary(0)
+        self.pending = {}
+        self._stop = threading.Event()
+
+    def add(self, path):
+        """Masukkan file ke antrian tunggu-stabil"""
+        if path not in self.pending:
+            self.pending[path] = (-1, time.monotonic())
+
+    def _ready_files(self):
+        """File yang ukurannya tidak berubah selama stable_seconds"""
+        now = time.monotonic()
+        ready = []
+        for path, (last_size, since) in list(self.pending.items()):
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                # Sudah dihapus/dipindah sebelum diproses
+                del self.pending[path]
+                continue
+            if size != last_size or size == 0:
+                self.pending[path] = (size, now)
+            elif now - since >= self.stable_seconds:
+                del self.pending[path]
+                ready.append(path)
+        return ready
+
+    def process(self, path, planner=None):
+        qr_text, detection_info = self.detector.detect_qr_code(path)
+        record = apply_result(path, qr_text, detection_info, self.detector.last_codes,
+                              planner=planner)
+        self.summary["total"] += 1
+        update_summary(self.summary, record)
+        if self.on_result:
+            self.on_result(record, self.summary)
+        return record
+
+    def run(self, initial_scan=True):
+        """Jalankan sampai stop() dipanggil (atau Ctrl+C)"""
+        if initial_scan:
+            for path in iter_image_files(self.folders, skip_renamed=True):
+                self.add(path)
+        # Cek ukuran cukup sering agar latency upload → rename tetap beberapa detik
+        tick = min(0.5, self.stable_seconds / 2) if self.stable_seconds else 0.5
+        try:
+            while not self._stop.is_set():
+                for path in self.watcher.poll(tick):
+                    self.add(path)
+                ready = self._ready_files()
+                if not ready:
+                    continue
+                # Planner baru per kelompok: listing folder tidak basi selama daemon jalan
+                planner = RenamePlanner(self.undo_path, append=True)
+                try:
+                    for path in ready:
+                        self.process(path, planner)
+                finally:
+                    planner.close()
+        finally:
+            self.watcher.close()
+        return self.summary
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ws_watch",
+        description="Pantau folder dan rename foto QR baru secara otomatis")
+    parser.add_argument("folders", nargs="+", help="Folder yang dipantau (rekursif)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Profile deteksi (default: %(default)s)")
+    parser.add_argument("--stable-seconds", type=float, default=DEFAULT_STABLE_SECONDS,
+                        help="File diproses setelah ukurannya tidak berubah selama N detik "
+                             "(default: %(default)s)")
+    parser.add_argument("--polling", action="store_true",
+                        help="Pakai polling walaupun inotify tersedia (mis. untuk SMB/NFS)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Interval polling dalam detik (default: %(default)s)")
+    parser.add_argument("--no-initial-scan", action="store_true",
+                        help="Jangan proses file yang sudah ada saat daemon mulai")
+    parser.add_argument("--budget-ms", type=float, metavar="MS",
+                        help="Batas waktu deteksi per gambar")
+    parser.add_argument("--undo-log", metavar="PATH",
+                        help=f"Undo log untuk semua rename (default: {UNDO_FILENAME} di folder "
+                             f"pertama); batalkan dengan python -m ws_planner PATH")
+    args = parser.parse_args(argv)
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            parser.error(f"Folder tidak ditemukan: {folder}")
+
+    def on_result(record, summary):
+        stamp = datetime.now().strftime("%H:%M:%S")
+        print(f"[{stamp}] " + format_record(record), flush=True)
+
+    watcher = make_watcher(args.folders, args.polling, args.poll_interval)
+    undo_path = args.undo_log or os.path.join(args.folders[0], UNDO_FILENAME)
+    daemon = WatchDaemon(args.folders, args.profile, watcher, args.stable_seconds, on_result,
+                         detector_options={"budget_ms": args.budget_ms}, undo_path=undo_path)
+    print(f"👀 Memantau {', '.join(args.folders)} ({watcher.name}), Ctrl+C untuk berhenti",
+          flush=True)
+    try:
+        summary = daemon.run(initial_scan=not args.no_initial_scan)
+    except KeyboardInterrupt:
+        summary = daemon.summary
+    print(format_summary(summary))
+    if summary["renamed"]:
+        print(f"↩️  Undo log: {undo_path} (batalkan: python -m ws_planner \"{undo_path}\")")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+QR ZXing Backend
+Decode QR dengan ZXing langsung dari array gambar di memori
+
+© mrdj 2025 for Team Wilkerstat 3206
+BPS (Badan Pusat Statistik) Tasikmalaya
+
+Backend utama adalah zxing-cpp (pip install zxing-cpp): library native yang
+berjalan di dalam proses Python, menerima array numpy BGR/grayscale secara
+langsung, tanpa file sementara dan tanpa proses Java.
+
+Jika zxing-cpp tidak terpasang, pyzxing (Java) dipakai sebagai fallback.
+Gambar ditulis sebagai PNG (lossless) ke folder sementara milik backend ini,
+jadi beberapa worker tidak pernah bertabrakan nama file.
+"""
+
+import os
+import shutil
+import tempfile
+
+import cv2
+
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+
+try:
+    from pyzxing import BarCodeReader
+except ImportError:
+    BarCodeReader = None
+
+
+BACKEND_ZXING_CPP = "zxing-cpp"
+BACKEND_PYZXING = "pyzxing"
+
+
+class ZXingBackend:
+    """Decoder ZXing yang dibuat sekali lalu dipakai untuk banyak gambar
+
+    decode(img) → list isi QR; decode_batch(images) → list per gambar.
+    backend berisi nama library yang dipakai, None jika tidak ada.
+    """
+
+    def __init__(self, prefer=None):
+        self.backend = None
+        self._reader = None
+        self._tmpdir = None
+
+        order = [BACKEND_ZXING_CPP, BACKEND_PYZXING]
+        if prefer in order:
+            order.remove(prefer)
+            order.insert(0, prefer)
+
+        for name in order:
+            if name == BACKEND_ZXING_CPP and zxingcpp is not None:
+                self.backend = name
+                break
+            if name == BACKEND_PYZXING and BarCodeReader is not None:
+                self._reader = BarCodeReader()
+                self.backend = name
+                break
+
+    @property
+    def available(self):
+        return self.backend is not None
+
+    def decode(self, img):
+        """Semua isi QR di gambar (array BGR/grayscale), urut seperti hasil ZXing"""
+        return self.decode_batch([img])[0]
+
+    def decode_batch(self, images):
+        """Decode banyak gambar sekaligus, return list of list isi QR"""
+        if self.backend == BACKEND_ZXING_CPP:
+            return [self._decode_cpp(img) for img in images]
+        if self.backend == BACKEND_PYZXING:
+            return self._decode_java(images)
+        return [[] for _ in images]
+
+    def _decode_cpp(self, img):
+        try:
+            results = zxingcpp.read_barcodes(img, formats=zxingcpp.BarcodeFormat.QRCode)
+        except Exception:
+            return []
+        return [r.text.strip() for r in results if r.text and r.text.strip()]
+
+    def _decode_java(self, images):
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="ws_zxing_")
+
+        decoded = []
+        for i, img in enumerate(images):
+            path = os.path.join(self._tmpdir, f"{i}.png")
+            codes = []
+            try:
+                cv2.imwrite(path, img)
+                for result in self._reader.decode(path) or []:
+                    parsed = result.get("parsed")
+                    if isinstance(parsed, bytes):
+                        parsed = parsed.decode("utf-8", errors="replace")
+                    if parsed and parsed.strip():
+                        codes.append(parsed.strip())
+            except Exception:
+                pass
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+            decoded.append(codes)
+        return decoded
+
+    def close(self):
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __del__(self):
+        self.close()